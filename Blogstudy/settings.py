@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.profiling.PerformanceMiddleware',  # 요청 시간 기록, 다른 미들웨어의 시간도 포함하도록 맨 앞에 둠
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.sidebar',
             ],
         },
     },
@@ -91,6 +93,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,  # 연결을 요청마다 새로 만들지 않고 60초 동안 재사용 (PRAGMA 도 연결할 때 한 번만 실행됨)
+    }
+}
+
+# 읽기 전용 복제본을 쓸 때는 DATABASES 에 복제본을 추가하고 별칭을 BLOG_READ_REPLICAS 에 넣음
+# 예) DATABASES['replica'] = {'ENGINE': ..., 'NAME': ..., 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['blog.db.ReadReplicaRouter']
+BLOG_READ_REPLICAS = []
+# 글, 댓글을 쓴 세션은 이 시간(초) 동안 복제본 대신 default 에서 읽음 (복제 지연보다 길게)
+BLOG_READ_YOUR_WRITES_SECONDS = 10
+
+# SQLite PRAGMA 프로필 (blog/db.py 의 SQLITE_PROFILES), 'default' 이면 SQLite 기본값 그대로
+BLOG_SQLITE_PROFILE = 'production'
+BLOG_SQLITE_PRAGMAS = {}  # 프로필의 값을 덮어쓸 PRAGMA, 예) {'cache_size': -16000}
+# CONN_MAX_AGE 로 재사용하는 연결이 끊겼는지 요청마다 확인
+BLOG_DB_HEALTH_CHECKS = True
+
+
+# Cache
+# ETag, 페이지 캐시, 템플릿 조각, 피드, 사이트맵은 캐시에 둔 버전(blog/caching.py)이 바뀌어야 새로 만들어지므로
+# 모든 웹 워커 프로세스와 run_tasks 워커가 같은 캐시를 써야 함 (프로세스마다 따로인 LocMemCache 를 쓰면
+# 글을 쓴 프로세스에서만 바뀌고 다른 프로세스는 계속 옛 페이지와 304 를 돌려줌)
+# SQLite 로 서버 한 대에서 돌릴 때는 파일 캐시, 서버가 여러 대라면 Redis 등 서버들이 함께 쓰는 캐시로 바꿀 것
+# 예) {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        # 넘치면 일부를 지움, 버전이 지워지면 바뀐 것으로 보므로 옛 페이지를 보여주지는 않음
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
@@ -152,4 +184,51 @@ SITE_ID = 1
 
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_EMAIL_VERIFICATION = 'none'
-LOGIN_REDIRECT_URL = '/blog/'
\ No newline at end of file
+LOGIN_REDIRECT_URL = '/blog/'
+
+# 로그인하지 않은 사용자에게 보여주는 블로그 페이지를 통째로 캐시하는 시간(초), 0 이면 사용하지 않음
+BLOG_ANONYMOUS_PAGE_CACHE = 0
+
+# 사이드바의 카테고리별 포스트 수를 캐시에 두는 시간(초), 카테고리가 바뀌면 시간과 상관없이 signals 에서 지움
+# 캐시를 공유하지 않는 다른 프로세스에서도 이 시간이 지나면 새 숫자를 봄
+BLOG_SIDEBAR_CACHE = 60 * 5
+
+# 태그 구름, 인기 태그 집계를 캐시에 두는 시간(초), 태그가 바뀌면 시간과 상관없이 새로 셈
+BLOG_TAG_CLOUD_TIMEOUT = 60 * 10
+BLOG_POPULAR_TAGS = 10  # 사이드바에 보여줄 인기 태그 수
+
+# RSS/Atom 피드의 포스트 수와 만든 피드를 캐시에 두는 시간(초), 포스트가 바뀌면 시간과 상관없이 새로 만듦
+BLOG_FEED_ITEMS = 20
+BLOG_FEED_CACHE = 60 * 60 * 24
+
+# 만든 사이트맵 조각을 캐시에 두는 시간(초), 포스트가 바뀌면 그 포스트가 든 조각만 새로 만듦
+BLOG_SITEMAP_CACHE = 60 * 60 * 24
+
+# 상세 페이지에 보여줄 관련 포스트 수, 바꾼 뒤에는 `python manage.py build_related_posts` 로 다시 계산
+# numpy, scipy 가 설치되어 있으면 관련 포스트를 희소 행렬로 계산함 (없어도 같은 결과를 조금 느리게 계산)
+BLOG_RELATED_POSTS = 5
+
+# 조회수는 프로세스마다 모아 두었다가 이 시간(초)이 지나거나 이만큼 모이면 한꺼번에 DB 에 더함
+BLOG_VIEW_COUNT_FLUSH_SECONDS = 10
+BLOG_VIEW_COUNT_FLUSH_SIZE = 500
+BLOG_MOST_READ = 5  # 사이드바에 보여줄 많이 읽은 글 수
+BLOG_MOST_READ_CACHE = 60 * 5  # 많이 읽은 글 순위를 캐시에 두는 시간(초)
+
+# 템플릿 조각({% cache_fragment %})을 캐시에 두는 시간(초), 내용이 바뀌면 시간과 상관없이 새 키를 씀, 0 이면 사용하지 않음
+BLOG_FRAGMENT_CACHE = 60 * 60 * 24
+
+# 포스트 저장 뒤의 작업(이미지, 검색 색인)은 작업 큐에 쌓이므로 `python manage.py run_tasks` 워커를 함께 실행해야 함
+# True 이면 큐에 넣지 않고 요청 안에서 바로 실행 (워커 없이 돌리는 테스트용)
+BLOG_TASKS_EAGER = False
+
+# ASGI 서버(uvicorn Blogstudy.asgi:application 등)로 실행할 때 True 로 두면
+# 리스트, 상세, 검색, 태그, 카테고리 페이지가 쿼리를 동시에 실행하는 비동기 뷰(blog/async_views.py)로 바뀜
+BLOG_ASYNC_VIEWS = False
+# 비동기 뷰에서 서로 관계없는 쿼리를 다른 스레드(다른 DB 연결)에서 동시에 실행할지
+BLOG_ASYNC_PARALLEL_QUERIES = True
+# 요청 시간 기록 (blog.profiling.PerformanceMiddleware)
+BLOG_PERF_ENABLED = True  # False 이면 PerformanceMiddleware 와 템플릿 렌더링 시간 측정을 쓰지 않음
+BLOG_PERF_SERVER_TIMING = DEBUG  # 응답에 Server-Timing 헤더를 붙일지
+BLOG_PERF_SLOW_QUERY_MS = 100  # 이보다 오래 걸린 쿼리는 로그로 남김
+BLOG_PERF_N_PLUS_ONE = 5  # 한 요청에서 같은 쿼리가 이만큼 반복되면 N+1 로 보고 로그로 남김
+BLOG_PERF_WINDOW = 500  # 뷰마다 최근 몇 개의 요청으로 백분위 수를 계산할지
@@ -19,11 +19,15 @@ from django.urls import path, include # include 도 추가로 import
 from django.conf import settings
 from django.conf.urls.static import static
 
+from blog import sitemaps
+
 urlpatterns = [
     path('blog/', include('blog.urls')), # blog/로 접근하면, blog.urls 파일을 참고해라!
     path('admin/', admin.site.urls),
     path('markdownx/', include('markdownx.urls')),
     path('accounts/', include('allauth.urls')),
+    path('sitemap.xml', sitemaps.sitemap_index),
+    path('sitemap-<str:section>-<int:shard>.xml', sitemaps.sitemap_shard),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
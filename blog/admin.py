@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Category, Tag, Comment
+from .models import Post, Category, Tag, Comment, Job
 from markdownx.admin import MarkdownxModelAdmin
 
 admin.site.register(Post, MarkdownxModelAdmin)
@@ -14,3 +14,11 @@ class TagAdmin(admin.ModelAdmin):
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Comment)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'args', 'status', 'attempts', 'duration_ms', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+
+
+admin.site.register(Job, JobAdmin)
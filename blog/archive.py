@@ -0,0 +1,222 @@
+"""
+다른 블로그의 글을 한꺼번에 옮기기 위한 가져오기/내보내기
+
+레코드 하나가 포스트 하나이며 JSON Lines 한 줄 또는 front matter 가 있는 마크다운 파일 하나로 표현됨
+마크다운에서는 댓글 목록을 front matter 의 comments 에 JSON 한 줄로 넣음
+{"title": ..., "hook_text": ..., "content": ..., "author": "username", "category": "python",
+ "tags": ["go", "js"], "created_at": "2022-02-17T08:48:00+00:00", "updated_at": ...,
+ "comments": [{"author": "username", "content": ..., "created_at": ..., "modified_at": ...}]}
+"""
+import json
+import os
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, Category, Comment
+from .tagging import get_or_create_tags, unique_slugs
+from .search import get_search_backend
+from .context_processors import clear_sidebar_cache
+from .caching import bump_version
+from .counters import reconcile_tag_counts, reconcile_category_counts
+from .sitemaps import bump_post_shards
+from .tasks import enqueue
+
+FRONT_MATTER_FIELDS = ('title', 'hook_text', 'author', 'category', 'tags', 'created_at', 'updated_at', 'comments')
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _format_datetime(value):
+    return value.isoformat() if value else None
+
+
+# 마크다운 front matter
+def parse_markdown(text):
+    """
+    ---
+    title: 첫 번째 포스트
+    tags: go, js
+    comments: [{"author": "user1", "content": "댓글", ...}]
+    ---
+    본문
+    """
+    record = {}
+    if text.startswith('---\n'):
+        end = text.find('\n---\n', 4)
+        if end != -1:
+            for line in text[4:end].splitlines():
+                key, sep, value = line.partition(':')
+                if sep:
+                    record[key.strip()] = value.strip()
+            text = text[end + 5:]
+    record['content'] = text.lstrip('\n')
+    if 'tags' in record:
+        record['tags'] = [tag.strip() for tag in record['tags'].split(',') if tag.strip()]
+    if 'comments' in record:
+        record['comments'] = json.loads(record['comments'])
+    return record
+
+
+def format_markdown(record):
+    lines = ['---']
+    for field in FRONT_MATTER_FIELDS:
+        value = record.get(field)
+        if field == 'tags':
+            value = ', '.join(value or [])
+        elif field == 'comments' and value:
+            value = json.dumps(value, ensure_ascii=False)  # 줄바꿈은 \n 으로 바뀌므로 한 줄에 들어감
+        if value:
+            lines.append(f'{field}: {value}')
+    lines.append('---')
+    return '\n'.join(lines) + '\n\n' + record['content']
+
+
+def read_records(path, fmt):
+    if fmt == 'markdown':
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.md'):
+                with open(os.path.join(path, name), encoding='utf-8') as f:
+                    yield parse_markdown(f.read())
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# 가져오기
+def _get_or_create_users(usernames):
+    users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+    missing = [name for name in usernames if name not in users]
+    if missing:  # 가져온 글의 작성자는 로그인할 수 없는 계정으로 만듦
+        password = make_password(None)
+        User.objects.bulk_create([User(username=name, password=password) for name in missing])
+        users.update({user.username: user for user in User.objects.filter(username__in=missing)})
+    return users
+
+
+def _get_or_create_categories(names):
+    categories = {category.name: category for category in Category.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in categories]
+    if missing:  # slug 가 기존 카테고리나 다른 새 카테고리와 겹치면 태그처럼 뒤에 숫자를 붙임
+        slugs = unique_slugs(Category, missing, default='category')
+        Category.objects.bulk_create([Category(name=name, slug=slugs[name]) for name in missing])
+        categories.update({category.name: category for category in Category.objects.filter(name__in=missing)})
+    return categories
+
+
+def import_batch(records):
+    """레코드 묶음을 bulk_create 로 저장, 레코드 수와 상관없이 일정한 수의 쿼리만 사용. 만든 포스트 목록을 돌려줌"""
+    usernames = {r['author'] for r in records if r.get('author')}
+    usernames |= {c['author'] for r in records for c in r.get('comments', ())}
+    category_names = {r['category'] for r in records if r.get('category')}
+    tag_names = list(dict.fromkeys(tag for r in records for tag in r.get('tags', ())))
+
+    with transaction.atomic():
+        users = _get_or_create_users(sorted(usernames))
+        categories = _get_or_create_categories(sorted(category_names))
+        tags = {tag.name: tag for tag in get_or_create_tags(tag_names)} if tag_names else {}
+
+        posts = []
+        for r in records:
+            post = Post(
+                title=r['title'],
+                hook_text=r.get('hook_text', ''),
+                content=r.get('content', ''),
+                author=users.get(r.get('author')),
+                category=categories.get(r.get('category')),
+                comment_count=len(r.get('comments', ())),
+            )
+            post.render_content()  # bulk_create 는 save() 를 부르지 않으므로 직접 렌더링
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+
+        # auto_now_add, auto_now 필드는 bulk_create 에서 현재 시각으로 덮어써지므로 원래 값으로 되돌림
+        dated = []
+        for post, r in zip(posts, records):
+            created_at = _parse_datetime(r.get('created_at'))
+            if created_at:
+                post.created_at = created_at
+                post.updated_at = _parse_datetime(r.get('updated_at')) or created_at
+                dated.append(post)
+        if dated:
+            Post.objects.bulk_update(dated, ['created_at', 'updated_at'])
+
+        Post.tags.through.objects.bulk_create([
+            Post.tags.through(post_id=post.pk, tag_id=tags[name].pk)
+            for post, r in zip(posts, records) for name in dict.fromkeys(r.get('tags', ()))
+        ])
+
+        comments = []
+        comment_dates = []
+        for post, r in zip(posts, records):
+            for c in r.get('comments', ()):
+                comments.append(Comment(post=post, author=users[c['author']], content=c['content']))
+                comment_dates.append((_parse_datetime(c.get('created_at')), _parse_datetime(c.get('modified_at'))))
+        Comment.objects.bulk_create(comments)
+        dated = []
+        for comment, (created_at, modified_at) in zip(comments, comment_dates):
+            if created_at:
+                comment.created_at = created_at
+                comment.modified_at = modified_at or created_at
+                dated.append(comment)
+        if dated:
+            Comment.objects.bulk_update(dated, ['created_at', 'modified_at'])
+
+    # bulk_create 는 signal 을 보내지 않으므로 검색 색인과 포스트가 들어간 사이트맵 조각의 버전은 여기서 직접 갱신
+    get_search_backend().index_posts(Post.objects.filter(pk__in=[post.pk for post in posts]).prefetch_related('tags'))
+    bump_post_shards([post.pk for post in posts])
+    return posts
+
+
+def finish_import():
+    # 태그/카테고리별 포스트 수도 signal 없이 바뀌었으므로 실제 값과 맞춤 (댓글 수는 import_batch 에서 넣음)
+    reconcile_tag_counts()
+    reconcile_category_counts()
+    enqueue('build_related_posts')  # 관련 포스트도 태그 연결이 한꺼번에 바뀌었으므로 전체를 다시 계산
+    # 사이드바 숫자와 페이지 캐시의 버전도 signal 없이 바뀌었으므로 한 번에 비움
+    clear_sidebar_cache()
+    bump_version('posts', 'sidebar', 'tags')
+
+
+# 내보내기
+def iter_records(queryset, batch_size=1000):
+    """pk 순서로 batch_size 씩 읽으며 레코드를 만들어 냄, 메모리에는 한 묶음만 올라감"""
+    queryset = queryset.select_related('author', 'category').prefetch_related('tags', 'comment_set__author')
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return
+        for post in batch:
+            yield {
+                'title': post.title,
+                'hook_text': post.hook_text,
+                'content': post.content,
+                'author': post.author.username if post.author else None,
+                'category': post.category.name if post.category else None,
+                'tags': [tag.name for tag in post.tags.all()],
+                'created_at': _format_datetime(post.created_at),
+                'updated_at': _format_datetime(post.updated_at),
+                'comments': [
+                    {
+                        'author': comment.author.username,
+                        'content': comment.content,
+                        'created_at': _format_datetime(comment.created_at),
+                        'modified_at': _format_datetime(comment.modified_at),
+                    }
+                    for comment in post.comment_set.all()
+                ],
+            }
+        last_pk = batch[-1].pk
@@ -0,0 +1,161 @@
+"""
+ASGI 서버(uvicorn, daphne 등)에서 쓰는 읽기 전용 뷰, settings.BLOG_ASYNC_VIEWS 가 True 이면 urls.py 에서 views.py 대신 씀
+
+장고 4.0 에는 비동기 ORM 이 없으므로 서로 관계없는 쿼리 묶음(포스트 목록, 사이드바, 댓글 등)을
+run_in_thread 로 각자 다른 스레드(다른 DB 연결)에서 동시에 실행하고 asyncio.gather 로 기다림
+DB 가 느려도 기다리는 동안 워커가 다른 요청을 처리할 수 있고, 한 요청 안의 쿼리 시간은 합이 아니라 가장 긴 것이 됨
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.shortcuts import render, get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .caching import (
+    anonymous_page_cache_key, get_cached_page, set_cached_page,
+    listing_etag, listing_last_modified, post_detail_etag, post_detail_last_modified,
+)
+from .context_processors import get_sidebar_data
+from .forms import CommentForm
+from .models import Post, Category, Tag
+from .pagination import paginate_by_cursor
+from .profiling import capture_queries
+from .related import get_related_posts
+from .search import get_search_backend
+from .views import PostList, get_comment_page, get_comment_next_url, get_comment_first_url
+
+
+def run_in_thread(func):
+    """
+    func 를 스레드 풀에서 실행하는 코루틴 함수로 바꿈
+    settings.BLOG_ASYNC_PARALLEL_QUERIES 가 False 이면 장고의 기본 동작처럼 한 스레드에서 차례로 실행함
+    (트랜잭션 안에서 도는 테스트처럼 모든 쿼리가 같은 DB 연결을 써야 하는 경우)
+    """
+    def run(*args, **kwargs):
+        try:
+            with capture_queries():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()  # 스레드 풀의 DB 연결도 CONN_MAX_AGE 에 맞춰 닫음
+
+    def run_sequential(*args, **kwargs):
+        with capture_queries():
+            return func(*args, **kwargs)
+
+    async def wrapper(*args, **kwargs):
+        if getattr(settings, 'BLOG_ASYNC_PARALLEL_QUERIES', True):
+            return await sync_to_async(run, thread_sensitive=False)(*args, **kwargs)
+        return await sync_to_async(run_sequential)(*args, **kwargs)
+    return wrapper
+
+
+def async_conditional_page(etag_func, last_modified_func):
+    """caching.conditional_page 의 비동기 뷰 버전, ETag/Last-Modified 로 304 응답을 주고 익명 사용자용 페이지 캐시를 적용"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            def prepare():
+                etag = etag_func(request, *args, **kwargs)
+                last_modified = last_modified_func(request, *args, **kwargs)
+                etag = quote_etag(etag) if etag else None
+                last_modified = int(last_modified.timestamp()) if last_modified else None
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                key = None
+                if response is None:
+                    key = anonymous_page_cache_key(request, etag_func, *args, **kwargs)
+                    response = get_cached_page(key) if key else None
+                return etag, last_modified, key, response
+
+            etag, last_modified, key, response = await run_in_thread(prepare)()
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+                if key:
+                    await run_in_thread(set_cached_page)(key, response)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
+
+
+async def listing_context(request, queryset, ordering, **extra):
+    """포스트 목록, 사이드바, extra 로 받은 코루틴(카테고리, 태그 등)을 동시에 실행해서 하나의 컨텍스트로 합침"""
+    context, sidebar, *values = await asyncio.gather(
+        run_in_thread(paginate_by_cursor)(request, queryset, PostList.paginate_by, ordering),
+        run_in_thread(get_sidebar_data)(),
+        *extra.values(),
+    )
+    context.update(zip(extra, values), sidebar=sidebar)
+    return context
+
+
+async def render_in_thread(request, template_name, context):  # 템플릿 안에서도 지연 평가로 쿼리가 실행될 수 있음
+    return await run_in_thread(render)(request, template_name, context)
+
+
+@async_conditional_page(listing_etag, listing_last_modified)
+async def post_list(request):
+    context = await listing_context(request, Post.objects.for_list(), PostList.ordering)
+    return await render_in_thread(request, 'blog/post_list.html', context)
+
+
+@async_conditional_page(post_detail_etag, post_detail_last_modified)
+async def post_detail(request, pk):
+    # 포스트, 댓글 첫 페이지, 사이드바는 서로 관계없으므로 동시에 가져옴 (댓글은 pk 만 있으면 됨)
+    post, page, sidebar, related_posts = await asyncio.gather(
+        run_in_thread(get_object_or_404)(Post.objects.select_related('author', 'category').prefetch_related('tags'), pk=pk),
+        run_in_thread(get_comment_page)(Post(pk=pk), request.GET.get('comments_after')),
+        run_in_thread(get_sidebar_data)(),
+        run_in_thread(get_related_posts)(Post(pk=pk)),
+    )
+    context = {
+        'post': post,
+        'object': post,
+        'sidebar': sidebar,
+        'comment_form': CommentForm,
+        'comment_list': page.object_list,
+        'comment_next_url': get_comment_next_url(post, page),
+        'comment_first_url': get_comment_first_url(post, page),
+        'related_posts': related_posts,
+    }
+    return await render_in_thread(request, 'blog/post_detail.html', context)
+
+
+@async_conditional_page(listing_etag, listing_last_modified)
+async def post_search(request, q):
+    backend = get_search_backend()
+    queryset = await run_in_thread(backend.search)(Post.objects.for_list(), q)  # 관련도 순으로 정렬됨
+    context = await listing_context(request, queryset, backend.ordering, count=run_in_thread(queryset.count)())
+    context['search_info'] = f'Search: {q}({context.pop("count")})'
+    return await render_in_thread(request, 'blog/post_list.html', context)
+
+
+@async_conditional_page(listing_etag, listing_last_modified)
+async def category_page(request, slug):
+    if slug == 'no_category':
+        context = await listing_context(request, Post.objects.filter(category=None).for_list(), PostList.ordering)
+        context['category'] = '미분류'
+    else:
+        # 카테고리와 포스트 목록을 동시에 가져오도록 포스트는 slug 로 거름
+        context = await listing_context(
+            request, Post.objects.filter(category__slug=slug).for_list(), PostList.ordering,
+            category=run_in_thread(Category.objects.get)(slug=slug),
+        )
+    return await render_in_thread(request, 'blog/post_list.html', context)
+
+
+@async_conditional_page(listing_etag, listing_last_modified)
+async def tag_page(request, slug):
+    context = await listing_context(
+        request, Post.objects.filter(tags__slug=slug).for_list(), PostList.ordering,
+        tag=run_in_thread(Tag.objects.get)(slug=slug),
+    )
+    return await render_in_thread(request, 'blog/post_list.html', context)
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from allauth.socialaccount.models import SocialAccount
+
+AVATAR_CACHE_KEY = 'blog:avatar:{}'
+DEFAULT_AVATAR_URL = '/blog/placeholder/avatar/200x200.svg'
+
+
+def get_avatar_urls(user_ids):
+    """사용자 pk 목록의 아바타 URL 을 캐시에서 한 번에 꺼내고, 없는 사용자만 소셜 계정을 쿼리 한 번으로 조회"""
+    user_ids = set(user_ids)
+    keys = {AVATAR_CACHE_KEY.format(user_id): user_id for user_id in user_ids}
+    urls = {keys[key]: url for key, url in cache.get_many(keys).items()}
+
+    missing = user_ids - set(urls)
+    if missing:
+        found = {}
+        for account in SocialAccount.objects.filter(user_id__in=missing).order_by('pk'):
+            found.setdefault(account.user_id, account.get_avatar_url())
+        for user_id in missing:
+            urls[user_id] = found.get(user_id) or DEFAULT_AVATAR_URL
+        # 소셜 계정이 바뀌면 signals 에서 지우므로 만료 시간 없이 저장
+        cache.set_many({AVATAR_CACHE_KEY.format(user_id): urls[user_id] for user_id in missing}, None)
+    return urls
+
+
+def attach_avatar_urls(comments):  # 댓글 목록에 avatar_url 을 미리 채워 둠
+    urls = get_avatar_urls(comment.author_id for comment in comments)
+    for comment in comments:
+        comment.avatar_url = urls[comment.author_id]
+    return comments
+
+
+def clear_avatar_cache(user_id):
+    cache.delete(AVATAR_CACHE_KEY.format(user_id))
@@ -0,0 +1,148 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from .models import Post
+
+VERSION_KEY = 'blog:version:{}'
+PAGE_CACHE_KEY = 'blog:page:{}'
+
+
+# 버전은 마지막으로 바뀐 시각(timestamp)이라 Last-Modified 로도 쓸 수 있음
+# 버전을 올린 프로세스 밖에서도 보여야 하므로 settings.CACHES 는 모든 프로세스가 함께 쓰는 캐시여야 함
+#  - posts : 포스트, 태그, 카테고리가 바뀌거나 마크다운을 다시 렌더링하면 올라감 (리스트, 상세 페이지)
+#  - sidebar : 사이드바의 카테고리 숫자가 바뀌면 올라감
+#  - tags : 태그 이름이나 포스트의 태그 연결이 바뀌면 올라감 (태그 구름, 인기 태그)
+#  - avatars : 소셜 계정(댓글 아바타)이 바뀌면 올라감
+#  - related : 미리 계산한 관련 포스트가 바뀌면 올라감 (상세 페이지)
+#  - views-{pk} : 포스트의 조회수를 DB 에 더하면(blog.view_counts.flush) 올라감 (상세 페이지의 조회수)
+#  - most-read : 사이드바의 많이 읽은 글 순위를 다시 세서 바뀌면 올라감 (사이드바가 있는 모든 페이지)
+def get_version(name):
+    version = cache.get(VERSION_KEY.format(name))
+    if version is None:  # 캐시에서 사라졌다면 지금 바뀐 것으로 봄
+        version = bump_version(name)
+    return version
+
+
+def bump_version(*names):
+    version = time.time()
+    cache.set_many({VERSION_KEY.format(name): version for name in names}, None)
+    return version
+
+
+def _make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _user_key(request):  # 로그인한 사용자마다 보이는 버튼이 다르므로 ETag 에 포함
+    return request.user.pk if request.user.is_authenticated else 0
+
+
+def _most_read_version():  # blog.view_counts 가 이 모듈을 import 하므로 함수 안에서 import
+    from .view_counts import get_most_read_version
+    return get_most_read_version()
+
+
+def listing_etag(request, *args, **kwargs):
+    return _make_etag(get_version('posts'), _most_read_version(), request.get_full_path(), _user_key(request))
+
+
+def feed_etag(request, *args, **kwargs):  # 피드는 사용자마다 다르지 않으므로 사용자는 넣지 않음
+    return _make_etag(get_version('posts'), request.get_full_path())
+
+
+def listing_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(max(get_version('posts'), _most_read_version()), tz=timezone.utc)
+
+
+def _post_detail_state(request, pk):
+    # 렌더링하지 않고 포스트와 댓글의 수정일자만 쿼리 한 번으로 가져옴
+    if not hasattr(request, '_post_detail_state'):
+        rows = list(Post.objects.filter(pk=pk).values_list('updated_at').annotate(
+            Count('comment'), Max('comment__modified_at')
+        ))
+        request._post_detail_state = rows[0] if rows else None
+    return request._post_detail_state
+
+
+def _post_detail_versions(pk):
+    return get_version('posts'), get_version('sidebar'), get_version('tags'), get_version('avatars'), get_version('related'), \
+        get_version(f'views-{pk}'), _most_read_version()
+
+
+def post_detail_etag(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None
+    return _make_etag(*state, *_post_detail_versions(pk), request.get_full_path(), _user_key(request))
+
+
+def post_detail_last_modified(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None
+    updated_at, comment_count, comments_modified_at = state
+    versions = max(_post_detail_versions(pk))
+    versions = datetime.fromtimestamp(versions, tz=timezone.utc)
+    return max(filter(None, [updated_at, comments_modified_at, versions]))
+
+
+def anonymous_page_cache_key(request, etag_func, *args, **kwargs):
+    """페이지 캐시를 쓸 요청이면 캐시 키를, 아니면 None 을 돌려줌"""
+    timeout = getattr(settings, 'BLOG_ANONYMOUS_PAGE_CACHE', 0)
+    if not timeout or request.method != 'GET' or request.user.is_authenticated:
+        return None
+    etag = etag_func(request, *args, **kwargs)
+    return PAGE_CACHE_KEY.format(etag) if etag is not None else None
+
+
+def get_cached_page(key):
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def set_cached_page(key, response, timeout=None):
+    if hasattr(response, 'render'):  # TemplateResponse 는 캐시에 넣기 전에 렌더링
+        response.render()
+    if response.status_code == 200 and not response.streaming:
+        timeout = timeout if timeout is not None else settings.BLOG_ANONYMOUS_PAGE_CACHE
+        cache.set(key, (response.content, response['Content-Type']), timeout)
+
+
+def cache_page_for_anonymous(etag_func):
+    """
+    settings.BLOG_ANONYMOUS_PAGE_CACHE 가 켜져 있으면 로그인하지 않은 사용자의 GET 응답을 통째로 캐시
+    캐시 키에 ETag 가 들어가므로 내용이 바뀌면 자동으로 새 키를 쓰게 됨
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = anonymous_page_cache_key(request, etag_func, *args, **kwargs)
+            if key is None:
+                return view_func(request, *args, **kwargs)
+            response = get_cached_page(key)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                set_cached_page(key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(etag_func, last_modified_func):
+    """ETag/Last-Modified 로 304 응답을 주고, 설정이 켜져 있으면 익명 사용자용 페이지 캐시도 적용"""
+    def decorator(view_func):
+        return condition(etag_func=etag_func, last_modified_func=last_modified_func)(
+            cache_page_for_anonymous(etag_func)(view_func)
+        )
+    return decorator
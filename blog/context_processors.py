@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Post, Category
+from .tagging import get_popular_tags
+from .view_counts import get_most_read
+
+SIDEBAR_CACHE_KEY = 'blog:sidebar'
+
+
+def get_sidebar_data():
+    data = cache.get(SIDEBAR_CACHE_KEY)
+    if data is None:
+        # 카테고리별 포스트 수는 signals 에서 관리하는 Category.post_count 를 그대로 씀
+        data = {
+            'categories': list(Category.objects.all()),
+            'no_category_post_count': Post.objects.filter(category=None).count(),
+        }
+        # 포스트의 카테고리나 카테고리 자체가 바뀌면 signals 에서 캐시를 지우고,
+        # 다른 프로세스가 지운 경우에도 BLOG_SIDEBAR_CACHE 초가 지나면 다시 셈
+        cache.set(SIDEBAR_CACHE_KEY, data, getattr(settings, 'BLOG_SIDEBAR_CACHE', 60 * 5))
+    return data
+
+
+def clear_sidebar_cache():
+    cache.delete(SIDEBAR_CACHE_KEY)
+
+
+def sidebar(request):
+    # 사이드바를 그리지 않는 페이지에서는 쿼리가 실행되지 않도록 지연 평가
+    return {
+        'sidebar': SimpleLazyObject(get_sidebar_data),
+        'popular_tags': SimpleLazyObject(get_popular_tags),
+        'most_read': SimpleLazyObject(get_most_read),
+    }
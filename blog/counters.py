@@ -0,0 +1,30 @@
+"""
+signals 로 관리하는 카운터(Post.comment_count, Tag.post_count, Category.post_count)를 실제 값과 맞춤
+
+bulk_create, QuerySet.update/delete, DB 를 직접 고친 경우에는 signal 이 오지 않아 카운터가 어긋날 수 있음
+각 함수는 UPDATE 쿼리 한 번으로 어긋난 행만 고치고 고친 행의 수를 돌려줌
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post, Category, Tag, Comment
+
+
+def _reconcile(queryset, field, counts):
+    actual = Coalesce(Subquery(counts.order_by().annotate(n=Count('pk')).values('n')), 0)
+    return queryset.exclude(**{field: actual}).update(**{field: actual})
+
+
+def reconcile_comment_counts():
+    return _reconcile(Post.objects.all(), 'comment_count',
+                      Comment.objects.filter(post=OuterRef('pk')).values('post'))
+
+
+def reconcile_tag_counts():
+    return _reconcile(Tag.objects.all(), 'post_count',
+                      Post.tags.through.objects.filter(tag=OuterRef('pk')).values('tag'))
+
+
+def reconcile_category_counts():
+    return _reconcile(Category.objects.all(), 'post_count',
+                      Post.objects.filter(category=OuterRef('pk')).values('category'))
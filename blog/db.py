@@ -0,0 +1,136 @@
+"""
+DB 연결 설정
+
+ - SQLite PRAGMA 프로필: 연결할 때마다 settings.BLOG_SQLITE_PROFILE 의 PRAGMA 를 적용
+   WAL 모드에서는 댓글을 쓰는 동안에도 다른 요청이 읽을 수 있음
+ - 연결 상태 확인: CONN_MAX_AGE 로 연결을 재사용할 때 요청 시작 전에 끊긴 연결을 닫음 (장고 4.1 의 CONN_HEALTH_CHECKS)
+ - 읽기 전용 복제본: @read_only 를 붙인 뷰의 읽기 쿼리만 settings.BLOG_READ_REPLICAS 로 보냄
+   쓰기 뷰에서 mark_written(request) 를 부르면 그 세션은 잠시 동안 복제본 대신 default 에서 읽음
+"""
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PROFILES = {
+    'default': {'journal_mode': 'delete'},  # SQLite 기본값 (WAL 은 DB 파일에 남으므로 되돌릴 때는 직접 지정)
+    'production': {
+        'journal_mode': 'wal',  # 쓰는 동안에도 읽을 수 있음
+        'synchronous': 'normal',  # WAL 에서는 normal 이어도 DB 가 깨지지 않음 (전원이 꺼지면 마지막 커밋만 잃을 수 있음)
+        'cache_size': -64000,  # 연결마다 64MB 페이지 캐시 (음수는 KB 단위)
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+        'busy_timeout': 5000,  # 다른 연결이 쓰는 중이면 바로 실패하지 않고 5초까지 기다림
+    },
+}
+
+
+def get_sqlite_pragmas():
+    pragmas = dict(SQLITE_PROFILES[getattr(settings, 'BLOG_SQLITE_PROFILE', 'default')])
+    pragmas.update(getattr(settings, 'BLOG_SQLITE_PRAGMAS', {}))
+    return pragmas
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in get_sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    # 재사용하는 연결이 끊겼다면(DB 재시작 등) 첫 쿼리에서 오류가 나기 전에 닫아서 다시 연결되도록 함
+    if not getattr(settings, 'BLOG_DB_HEALTH_CHECKS', True):
+        return
+    for connection in connections.all():
+        if connection.connection is not None and connection.settings_dict['CONN_MAX_AGE'] \
+                and not connection.in_atomic_block and not connection.is_usable():
+            connection.close()
+
+
+# 읽기 전용 복제본
+_read_only = ContextVar('blog_read_only', default=False)
+LAST_WRITE_SESSION_KEY = 'blog_last_write'
+
+
+def mark_written(request):
+    """쓰기 뷰에서 부름, settings.BLOG_READ_YOUR_WRITES_SECONDS 동안 이 세션의 @read_only 뷰는 default 에서 읽음"""
+    if getattr(settings, 'BLOG_READ_REPLICAS', []) and hasattr(request, 'session'):
+        request.session[LAST_WRITE_SESSION_KEY] = time.time()
+
+
+def _recently_written(request):  # 복제가 늦어도 방금 쓴 사람은 자기가 쓴 데이터를 보도록
+    session = getattr(request, 'session', None)
+    if session is None or not getattr(settings, 'BLOG_READ_REPLICAS', []):  # 복제본이 없으면 세션을 읽지 않음
+        return False
+    return time.time() - session.get(LAST_WRITE_SESSION_KEY, 0) < getattr(settings, 'BLOG_READ_YOUR_WRITES_SECONDS', 10)
+
+
+def read_only(view_func):
+    """
+    이 뷰 안의 읽기 쿼리는 읽기 전용 복제본으로 보냄, 동기/비동기 뷰 모두 쓸 수 있음
+    방금 쓰기 요청을 보낸 세션(mark_written)의 요청은 default 에서 읽음
+    """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(*args, **kwargs):
+            if args and await sync_to_async(_recently_written)(args[0]):  # 세션은 DB 에서 읽을 수 있음
+                return await view_func(*args, **kwargs)
+            token = _read_only.set(True)
+            try:
+                return await view_func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        if args and _recently_written(args[0]):
+            return view_func(*args, **kwargs)
+        token = _read_only.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    settings.BLOG_READ_REPLICAS 에 DATABASES 의 별칭 목록을 넣으면 @read_only 뷰의 읽기를 그중 하나로 보냄
+    쓰기와 그 밖의 읽기는 default 로 감
+    복제본은 default 보다 늦을 수 있으므로, 쓴 사람이 바로 자기 글을 보는 것은 mark_written 을 부른 쓰기 뷰에서
+    settings.BLOG_READ_YOUR_WRITES_SECONDS 안에 같은 세션으로 읽는 경우만 보장됨 (그 시간보다 늦는 복제는 보장하지 않음)
+    """
+
+    def replicas(self):
+        return getattr(settings, 'BLOG_READ_REPLICAS', [])
+
+    def db_for_read(self, model, **hints):
+        replicas = self.replicas()
+        if replicas and _read_only.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):  # 복제본에서 읽은 객체도 default 의 객체와 같은 DB 로 봄
+        databases = {'default', *self.replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # 복제본은 default 를 복제해서 만들어짐
+        return False if db in self.replicas() else None
@@ -0,0 +1,116 @@
+"""
+RSS/Atom 피드: 전체, 카테고리별, 태그별
+
+피드 리더는 같은 주소를 계속 요청하므로
+ - 'posts' 버전으로 만든 ETag/Last-Modified 가 같으면 쿼리 없이 304 로 끝냄
+ - 버전이 바뀐 뒤 처음 요청할 때만 피드를 만들고, 로그인 여부와 상관없이 settings.BLOG_FEED_CACHE 초 동안 캐시에 둠
+ - 본문은 미리 렌더링해 둔 content_html 을 그대로 씀
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .caching import feed_etag, listing_last_modified, get_cached_page, set_cached_page
+from .models import Post, Category, Tag
+
+FEED_CACHE_KEY = 'blog:feed:{}'
+
+
+def cached_feed(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = FEED_CACHE_KEY.format(feed_etag(request))
+        response = get_cached_page(key)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+            set_cached_page(key, response, getattr(settings, 'BLOG_FEED_CACHE', 60 * 60 * 24))
+        return response
+    return condition(etag_func=feed_etag, last_modified_func=listing_last_modified)(wrapper)
+
+
+class LatestPostsFeed(Feed):
+    title = 'Blog'
+    link = '/blog/'
+    description = '새로 올라온 포스트'
+
+    def items(self, obj=None):
+        queryset = self.get_queryset(obj).select_related('author', 'category').prefetch_related('tags')
+        return queryset.order_by('-created_at', '-pk')[:getattr(settings, 'BLOG_FEED_ITEMS', 20)]
+
+    def get_queryset(self, obj):
+        return Post.objects.all()
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.get_content_markdown()
+
+    def item_author_name(self, item):
+        return item.author.username if item.author else None
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_categories(self, item):
+        return [tag.name for tag in item.tags.all()] + ([item.category.name] if item.category else [])
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def get_queryset(self, obj):
+        return Post.objects.filter(category=obj)
+
+    def title(self, obj):
+        return f'Blog - {obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def description(self, obj):
+        return f'{obj.name} 카테고리의 새 포스트'
+
+
+class CategoryAtomFeed(CategoryFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class TagFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def get_queryset(self, obj):
+        return Post.objects.filter(tags=obj)
+
+    def title(self, obj):
+        return f'Blog - #{obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def description(self, obj):
+        return f'{obj.name} 태그가 달린 새 포스트'
+
+
+class TagAtomFeed(TagFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
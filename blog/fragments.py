@@ -0,0 +1,54 @@
+"""
+템플릿 조각 캐시, 템플릿에서는 {% load fragment_cache %} 의 cache_fragment 태그로 씀
+
+    {% cache_fragment 'post_card' p.pk p.updated_at versions 'tags' 'sidebar' %} ... {% endcache_fragment %}
+
+키는 조각 이름, 값들(포스트의 updated_at 등), blog.caching 버전으로 만들므로
+포스트를 저장하면(updated_at) 또는 태그, 카테고리가 바뀌면(버전) 자동으로 새 키를 쓰고, 옛 키는 TTL 이 지나면 사라짐
+조각 이름별 hit/miss 수는 프로세스마다 모아서 /blog/perf/fragments/ 에서 볼 수 있음
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import get_version
+
+FRAGMENT_CACHE_KEY = 'blog:fragment:{}:{}'
+
+_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def fragment_key(name, vary_on=(), versions=(), version_getter=get_version):
+    parts = [str(value) for value in vary_on] + [str(version_getter(version)) for version in versions]
+    return FRAGMENT_CACHE_KEY.format(name, hashlib.md5(':'.join(parts).encode()).hexdigest())
+
+
+def get_or_render(name, key, render):
+    """캐시에 있으면 그 문자열을, 없으면 render() 의 결과를 캐시에 넣고 돌려줌"""
+    if not getattr(settings, 'BLOG_FRAGMENT_CACHE', 60 * 60 * 24):  # 0 이면 캐시하지 않음
+        return render()
+    content = cache.get(key)
+    with _lock:
+        _stats[name]['hits' if content is not None else 'misses'] += 1
+    if content is None:
+        content = render()
+        cache.set(key, content, getattr(settings, 'BLOG_FRAGMENT_CACHE', 60 * 60 * 24))
+    return content
+
+
+def get_fragment_stats():
+    """{조각 이름: {'hits': n, 'misses': n, 'hit_ratio': 0 ~ 1}}"""
+    with _lock:
+        stats = {name: dict(counts) for name, counts in _stats.items()}
+    for counts in stats.values():
+        counts['hit_ratio'] = round(counts['hits'] / (counts['hits'] + counts['misses']), 3)
+    return dict(sorted(stats.items()))
+
+
+def reset_fragment_stats():
+    with _lock:
+        _stats.clear()
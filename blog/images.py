@@ -0,0 +1,77 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# 포스트 카드(약 730px)와 상세 페이지(약 900px)에서 화면 크기별로 골라 쓸 가로 크기
+VARIANT_WIDTHS = (400, 800, 1200)
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def variant_name(name, width, fmt):
+    # blog/images/2022/02/17/photo.png => blog/images/2022/02/17/photo.w400.webp (원본 옆에 저장)
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{fmt}'
+
+
+def generate_variants(name, storage=default_storage):
+    """
+    원본 이미지를 읽어 VARIANT_WIDTHS 크기의 WebP/JPEG 파일을 만들고
+    {'source': 원본 경로, 'webp': {'400': 'blog/images/...w400.webp', ...}, 'jpeg': {...}} 형태로 돌려줌
+    원본보다 큰 크기는 만들지 않음 (원본이 가장 작은 크기보다 작으면 원본 크기로 하나만 만듦)
+    """
+    with storage.open(name, 'rb') as f:
+        image = ImageOps.exif_transpose(Image.open(f))
+        image.load()
+
+    widths = [width for width in VARIANT_WIDTHS if width < image.width] or [image.width]
+    variants = {'source': name}
+    variants.update({fmt: {} for fmt in VARIANT_FORMATS})
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        for fmt, options in VARIANT_FORMATS.items():
+            converted = resized
+            if fmt == 'jpeg' and resized.mode != 'RGB':  # JPEG 는 투명도가 없으므로 흰 배경에 합성
+                converted = Image.new('RGB', resized.size, (255, 255, 255))
+                converted.paste(resized, mask=resized.convert('RGBA').getchannel('A'))
+            elif resized.mode not in ('RGB', 'RGBA'):
+                converted = resized.convert('RGBA')
+
+            buffer = BytesIO()
+            converted.save(buffer, **options)
+            path = variant_name(name, width, fmt)
+            if storage.exists(path):
+                storage.delete(path)
+            variants[fmt][str(width)] = storage.save(path, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(variants, storage=default_storage):
+    for fmt in VARIANT_FORMATS:
+        for path in (variants or {}).get(fmt, {}).values():
+            if storage.exists(path):
+                storage.delete(path)
+
+
+def build_srcset(paths, storage=default_storage):  # {'400': path} => "url 400w, url 800w"
+    return ', '.join(f'{storage.url(path)} {width}w' for width, path in sorted(paths.items(), key=lambda i: int(i[0])))
+
+
+def placeholder_svg(seed, width, height):
+    """외부 서비스(picsum.photos) 대신 쓰는 자리 표시 이미지, seed 마다 다른 색의 그라데이션"""
+    digest = hashlib.md5(str(seed).encode()).hexdigest()
+    start, end = f'#{digest[:6]}', f'#{digest[6:12]}'
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" preserveAspectRatio="xMidYMid slice">'
+        f'<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1">'
+        f'<stop offset="0" stop-color="{start}"/><stop offset="1" stop-color="{end}"/>'
+        f'</linearGradient></defs><rect width="100%" height="100%" fill="url(#g)"/></svg>'
+    )
@@ -0,0 +1,200 @@
+"""
+자주 쓰이는 URL 의 응답 시간, 처리량, 쿼리 수를 재는 벤치마크
+
+    # 벤치마크용 DB 를 쓰는 설정으로 실행할 것 (--seed 는 지금 DB 에 데이터를 추가함)
+    python manage.py benchmark --seed --posts 100000 --comments 1000000
+    python manage.py benchmark --output bench.json
+    python manage.py benchmark --baseline bench.json  # 기준보다 느려지거나 쿼리가 늘면 실패
+
+결과 JSON 은 {"meta": {...}, "results": {"post_list": {"p50_ms": ..., "queries": ...}, ...}} 형태이고
+그대로 다음 실행의 --baseline 으로 쓸 수 있음
+"""
+import json
+import random
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.archive import import_batch, finish_import
+from blog.models import Post, Category, Tag, Comment
+
+WORDS = (
+    'django python rust go javascript database index cache query template async server client test '
+    'benchmark markdown image search feed sitemap tag category comment post blog static worker'
+).split()
+
+
+def make_records(count, comments, tags, categories, users, start=0, seed=0):
+    """벤치마크용 레코드를 만듦, seed 가 같으면 항상 같은 데이터"""
+    rng = random.Random(seed + start)
+    created = timezone.now() - timezone.timedelta(minutes=count)
+    comments_per_post = comments / count if count else 0
+    for i in range(start, start + count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(80, 300))]
+        paragraphs = [' '.join(words[j:j + 40]) for j in range(0, len(words), 40)]
+        created_at = (created + timezone.timedelta(minutes=i - start)).isoformat()
+        n_comments = int(comments_per_post) + (rng.random() < comments_per_post % 1)
+        yield {
+            'title': f'벤치마크 포스트 {i} {rng.choice(WORDS)}',
+            'hook_text': ' '.join(words[:10]),
+            'content': f'# {words[0]}\n\n' + '\n\n'.join(paragraphs),
+            'author': f'bench_user_{rng.randrange(users)}',
+            'category': f'bench_category_{rng.randrange(categories)}' if rng.random() < 0.9 else None,
+            'tags': sorted({f'bench_tag_{rng.randrange(tags)}' for _ in range(rng.randint(0, 4))}),
+            'created_at': created_at,
+            'comments': [
+                {'author': f'bench_user_{rng.randrange(users)}', 'content': ' '.join(rng.sample(WORDS, 8)),
+                 'created_at': created_at}
+                for _ in range(n_comments)
+            ],
+        }
+
+
+def hot_urls(n):
+    """URL 종류마다 요청할 URL n 개, 실제 데이터에서 골고루 고름"""
+    rng = random.Random(0)
+    max_pk = Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    pks = [rng.randint(1, max_pk) for _ in range(n * 3)] if max_pk else []
+    pks = list(Post.objects.filter(pk__in=pks).values_list('pk', flat=True))[:n]
+    tags = list(Tag.objects.filter(post_count__gt=0).order_by('-post_count').values_list('slug', flat=True)[:n])
+    categories = list(Category.objects.values_list('slug', flat=True)[:n])
+
+    def cycle(items, url):
+        return [url.format(items[i % len(items)]) for i in range(n)] if items else []
+
+    return {
+        'post_list': ['/blog/'] * n,
+        'post_detail': cycle(pks, '/blog/{}/'),
+        'search': cycle(WORDS, '/blog/search/{}/'),
+        'tag_page': cycle(tags, '/blog/tag/{}/'),
+        'category_page': cycle(categories, '/blog/category/{}/'),
+    }
+
+
+def benchmark_client():
+    host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+    return Client(HTTP_HOST=host)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))]
+
+
+class Command(BaseCommand):
+    help = '블로그의 주요 URL 을 테스트 클라이언트로 여러 번 요청해서 응답 시간과 쿼리 수를 잽니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='측정 전에 벤치마크 데이터를 만듦')
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=50, help='URL 종류마다 보낼 요청 수')
+        parser.add_argument('--output', help='결과를 저장할 JSON 파일')
+        parser.add_argument('--baseline', help='비교할 이전 결과 JSON 파일')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p50, p90 이 기준보다 이 비율 이상 느려지면 실패')
+
+    def seed(self, options):
+        start = Post.objects.count()
+        started = time.monotonic()
+        records = make_records(options['posts'], options['comments'], options['tags'], options['categories'],
+                               options['users'], start=start)
+        batch = []
+        done = 0
+        for record in records:
+            batch.append(record)
+            if len(batch) >= options['batch_size']:
+                done += len(import_batch(batch))
+                batch = []
+                self.stdout.write(f'{done}개 만듦 ({time.monotonic() - started:.0f}s)')
+        if batch:
+            done += len(import_batch(batch))
+        finish_import()
+        self.stdout.write(f'{done}개의 포스트를 만들었습니다. ({time.monotonic() - started:.0f}s)')
+
+    def measure(self, urls):
+        client = benchmark_client()
+        client.get(urls[0])  # 첫 요청(모듈 로딩, 템플릿 컴파일)은 빼고 잼
+        latencies, queries = [], []
+        started = time.perf_counter()
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                request_started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            queries.append(len(ctx.captured_queries))
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': len(urls),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'p50_ms': round(_percentile(latencies, 50), 2),
+            'p90_ms': round(_percentile(latencies, 90), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+            'throughput_rps': round(len(urls) / elapsed, 1),
+            'queries': max(queries),
+        }
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, base in baseline.get('results', {}).items():
+            current = results.get(name)
+            if current is None:
+                continue
+            for metric in ('p50_ms', 'p90_ms'):
+                if current[metric] > base[metric] * (1 + threshold):
+                    regressions.append(f'{name} {metric}: {base[metric]} -> {current[metric]}')
+            if current['queries'] > base['queries']:
+                regressions.append(f'{name} queries: {base["queries"]} -> {current["queries"]}')
+        return regressions
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options)
+
+        results = {}
+        for name, urls in hot_urls(options['requests']).items():
+            if not urls:
+                self.stderr.write(f'{name}: 요청할 데이터가 없어 건너뜀')
+                continue
+            results[name] = self.measure(urls)
+            r = results[name]
+            self.stdout.write(
+                f'{name:<14} p50 {r["p50_ms"]:>8.2f}ms  p90 {r["p90_ms"]:>8.2f}ms  p99 {r["p99_ms"]:>8.2f}ms  '
+                f'{r["throughput_rps"]:>7.1f} req/s  {r["queries"]} queries'
+            )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'tags': Tag.objects.count(),
+                'categories': Category.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                regressions = self.compare(results, json.load(f), options['threshold'])
+            if regressions:
+                raise CommandError('기준보다 나빠졌습니다.\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('기준과 비교해서 나빠진 곳이 없습니다.'))
@@ -0,0 +1,127 @@
+"""
+댓글을 쓰는 동안 읽기 처리량이 얼마나 유지되는지 재는 벤치마크
+
+    python manage.py benchmark_concurrency --readers 4 --writers 2 --duration 10
+
+읽기 프로세스만 돌린 결과와, 같은 수의 읽기 프로세스에 댓글을 쓰는 프로세스를 함께 돌린 결과를 나란히 보여줌
+SQLite 는 파일 DB 여야 하고, 댓글을 실제로 추가하므로 벤치마크용 DB 에서 실행할 것
+BLOG_SQLITE_PROFILE 을 'default' 와 'production' 으로 바꿔 가며 실행하면 WAL 의 효과를 볼 수 있음
+"""
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, OperationalError
+
+from blog.db import get_sqlite_pragmas
+from blog.models import Post, Comment
+from .benchmark import hot_urls, benchmark_client, _percentile
+
+WRITER_USERNAME = 'bench_writer'
+
+
+def _close_connections():  # fork 한 프로세스가 부모의 DB 연결을 함께 쓰지 않도록
+    connections.close_all()
+
+
+def read_worker(urls, duration):
+    client = benchmark_client()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            status = client.get(urls[i % len(urls)]).status_code
+        except OperationalError:  # database is locked
+            status = None
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors += status != 200
+        i += 1
+    return latencies, errors
+
+
+def write_worker(post_ids, duration):
+    # new_comment 뷰와 같은 경로로 댓글을 씀 (로그인한 사용자의 POST)
+    client = benchmark_client()
+    client.force_login(User.objects.get(username=WRITER_USERNAME))
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            status = client.post(f'/blog/{post_ids[i % len(post_ids)]}/new_comment/',
+                                 {'content': f'concurrency benchmark {i}'}).status_code
+        except OperationalError:
+            status = None
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors += status != 302
+        i += 1
+    return latencies, errors
+
+
+def _summary(results, duration):
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    if not latencies:
+        return {'requests': 0, 'errors': sum(errors for _, errors in results)}
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'per_second': round(len(latencies) / duration, 1),
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = '댓글을 쓰는 프로세스가 함께 돌 때 읽기 처리량과 응답 시간이 어떻게 바뀌는지 잽니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10, help='단계마다 요청을 보내는 시간(초)')
+        parser.add_argument('--output', help='결과를 저장할 JSON 파일')
+
+    def run(self, readers, writers, duration, urls, post_ids):
+        _close_connections()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(readers + writers, mp_context=context, initializer=_close_connections) as pool:
+            read_futures = [pool.submit(read_worker, urls, duration) for _ in range(readers)]
+            write_futures = [pool.submit(write_worker, post_ids, duration) for _ in range(writers)]
+            return {
+                'reads': _summary([future.result() for future in read_futures], duration),
+                'writes': _summary([future.result() for future in write_futures], duration),
+            }
+
+    def handle(self, *args, **options):
+        if options['readers'] < 1 or options['writers'] < 0:
+            raise CommandError('--readers 는 1 이상, --writers 는 0 이상이어야 합니다.')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('메모리 DB 는 프로세스끼리 공유할 수 없습니다. 파일 DB 에서 실행하세요.')
+        urls = [url for group in hot_urls(20).values() for url in group]
+        post_ids = list(Post.objects.order_by('-pk').values_list('pk', flat=True)[:100])
+        if not post_ids:
+            raise CommandError('포스트가 없습니다. benchmark --seed 로 데이터를 먼저 만드세요.')
+        User.objects.get_or_create(username=WRITER_USERNAME)
+        comments_before = Comment.objects.count()
+
+        report = {'pragmas': get_sqlite_pragmas() if connection.vendor == 'sqlite' else {}}
+        report['read_only'] = self.run(options['readers'], 0, options['duration'], urls, post_ids)
+        report['read_write'] = self.run(options['readers'], options['writers'], options['duration'], urls, post_ids)
+        report['comments_written'] = Comment.objects.count() - comments_before
+
+        for phase in ('read_only', 'read_write'):
+            reads, writes = report[phase]['reads'], report[phase]['writes']
+            line = f'{phase:<10} reads {reads.get("per_second", 0):>7.1f}/s p99 {reads.get("p99_ms", 0):>8.2f}ms ' \
+                   f'errors {reads["errors"]}'
+            if writes['requests']:
+                line += f' | writes {writes["per_second"]:>6.1f}/s p99 {writes["p99_ms"]:>8.2f}ms errors {writes["errors"]}'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = '모든 포스트의 관련 포스트를 태그로 다시 계산해서 저장합니다.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = related.build_related_posts()
+        engine = 'numpy/scipy' if related.sparse is not None else 'python'
+        self.stdout.write(self.style.SUCCESS(
+            f'{count}개 포스트의 관련 포스트를 계산했습니다. ({engine}, {time.monotonic() - started:.1f}s)'
+        ))
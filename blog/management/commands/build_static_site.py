@@ -0,0 +1,220 @@
+"""
+블로그 페이지를 정적 HTML 로 미리 만들어 두는 명령
+
+    python manage.py build_static_site --output build --workers 4
+
+/blog/5/ 는 build/blog/5/index.html 로, 커서 페이지(/blog/?after=XXX)는 build/blog/__after__/XXX.html 로 저장됨
+nginx 에서는 다음처럼 정적 파일을 먼저 찾고, 없으면 장고로 넘기면 됨
+
+    location /blog/ {
+        root /path/to/build;
+        error_page 418 = @django;
+        if ($arg_before) { return 418; }
+        try_files ${uri}__after__/${arg_after}.html ${uri}index.html @django;
+    }
+
+두 번째 실행부터는 build/.manifest.json 과 비교해서 바뀐 포스트의 상세 페이지와
+그 포스트가 보이는 리스트(전체, 카테고리, 태그) 페이지만 다시 만듦
+포스트의 이미지(head_image_variants), 조회수, 관련 포스트가 바뀌어도 그 포스트의 페이지를 다시 만들고,
+관련 포스트로 보이는 포스트의 제목이 바뀌면 그 포스트를 관련 포스트로 보여주는 상세 페이지도 다시 만듦
+사이드바(카테고리 숫자, 인기 태그의 포스트 수, 많이 읽은 글)나 태그 이름이 바뀌면 모든 페이지에 보이므로 전부 다시 만듦
+
+전체를 다시 만들 때는 출력 폴더를 지우므로, 이 명령이 만든 폴더(.build_static_site 파일이 있는 폴더)나
+빈 폴더만 출력 폴더로 쓸 수 있음
+200 이 아닌 응답이 있으면 빌드를 멈추고, 페이지를 만드는 요청은 조회수로 세지 않음
+"""
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.test import Client
+
+from blog.context_processors import get_sidebar_data
+from blog.models import Post, RelatedPost, Tag
+from blog.tagging import get_popular_tags
+from blog.view_counts import SKIP_VIEW_COUNT, get_most_read
+
+MANIFEST_NAME = '.manifest.json'
+MARKER_NAME = '.build_static_site'  # 이 명령이 만든 출력 폴더라는 표시
+
+
+def _client():
+    host = next((host for host in settings.ALLOWED_HOSTS if not host.startswith('.') and host != '*'), 'localhost')
+    return Client(HTTP_HOST=host, **{SKIP_VIEW_COUNT: True})
+
+
+def _get(client, path):  # 404, 500 페이지를 정적 파일로 내보내지 않도록 200 이 아니면 빌드를 멈춤
+    response = client.get(path)
+    if response.status_code != 200:
+        raise CommandError(f'{path} 응답이 {response.status_code} 입니다.')
+    return response.content
+
+
+def _prepare_output(output):
+    """전체 빌드 전에 출력 폴더를 비움, 이 명령이 만든 폴더가 아니면 지우지 않고 멈춤"""
+    if os.path.isdir(output) and os.listdir(output):
+        if not any(os.path.exists(os.path.join(output, name)) for name in (MARKER_NAME, MANIFEST_NAME)):
+            raise CommandError(f'{output} 는 build_static_site 가 만든 폴더가 아닙니다. 빈 폴더나 새 경로를 지정하세요.')
+        shutil.rmtree(output)
+    os.makedirs(output, exist_ok=True)
+    open(os.path.join(output, MARKER_NAME), 'w').close()
+
+
+def _output_path(output, path):
+    parts = urlsplit(path)
+    after = parse_qs(parts.query).get('after')
+    if after:
+        return os.path.join(output, parts.path.lstrip('/'), '__after__', f'{after[0]}.html')
+    return os.path.join(output, parts.path.lstrip('/'), 'index.html')
+
+
+def _write(output, path, content):
+    filename = _output_path(output, path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'wb') as f:
+        f.write(content)
+
+
+def render_detail_pages(output, paths):
+    client = _client()
+    for path in paths:
+        _write(output, path, _get(client, path))
+    return len(paths)
+
+
+def render_listing(output, path, max_pages=None):
+    """리스트의 첫 페이지부터 Older 링크를 따라가며 모든 페이지를 만듦"""
+    client = _client()
+    count = 0
+    url = path
+    while url and (max_pages is None or count < max_pages):
+        content = _get(client, url)
+        _write(output, url, content)
+        count += 1
+        older = BeautifulSoup(content, 'html.parser').find('a', string='Older')
+        href = older.attrs['href'] if older else '#'
+        url = path + href if href != '#' else None
+    return count
+
+
+def _close_connections():  # fork 한 프로세스가 부모의 DB 연결을 함께 쓰지 않도록
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = '리스트, 상세, 카테고리, 태그 페이지를 정적 HTML 로 만듭니다. (바뀐 페이지만 다시 만듦)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'build'))
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--full', action='store_true', help='바뀐 것과 상관없이 모든 페이지를 다시 만듦')
+        parser.add_argument('--max-listing-pages', type=int, default=None,
+                            help='리스트마다 만들 최대 페이지 수, 나머지는 장고가 처리')
+
+    def snapshot(self):
+        # 페이지 내용을 결정하는 값들, 이전 빌드의 값과 비교해서 다시 만들 페이지를 고름
+        comments_modified = dict(
+            Post.objects.order_by().values_list('pk').annotate(Max('comment__modified_at'))
+        )
+        tag_ids = {}
+        for post_id, tag_id in Post.tags.through.objects.values_list('post_id', 'tag_id'):
+            tag_ids.setdefault(post_id, []).append(tag_id)
+        related_ids = {}
+        for post_id, related_id in RelatedPost.objects.order_by('post_id', 'rank').values_list('post_id', 'related_id'):
+            related_ids.setdefault(post_id, []).append(related_id)
+
+        posts = {}
+        for pk, updated_at, comment_count, category_id, head_image_variants, view_count in Post.objects.values_list(
+            'pk', 'updated_at', 'comment_count', 'category_id', 'head_image_variants', 'view_count'
+        ).iterator():
+            posts[str(pk)] = [
+                updated_at.isoformat(), comment_count, str(comments_modified.get(pk)), category_id,
+                sorted(tag_ids.get(pk, [])), head_image_variants, view_count, related_ids.get(pk, []),
+            ]
+        sidebar = get_sidebar_data()
+        return {
+            # 페이지와 같은 캐시에서 읽으므로 만든 페이지에 보이는 값과 같음
+            'sidebar': [[c.pk, c.name, c.slug, c.post_count] for c in sidebar['categories']]
+                       + [sidebar['no_category_post_count']]
+                       + [[tag['slug'], tag['count']] for tag in get_popular_tags()]
+                       + [[post['pk'], post['title'], post['view_count']] for post in get_most_read()],
+            'tags': {str(pk): [name, slug] for pk, name, slug in Tag.objects.values_list('pk', 'name', 'slug')},
+            'posts': posts,
+        }
+
+    def handle(self, *args, **options):
+        output = options['output']
+        manifest_path = os.path.join(output, MANIFEST_NAME)
+        current = self.snapshot()
+
+        previous = None
+        if not options['full'] and os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                previous = json.load(f)
+        if previous and (previous['sidebar'] != current['sidebar'] or previous['tags'] != current['tags']):
+            previous = None  # 모든 페이지에 보이는 값이 바뀜
+
+        categories = {c.pk: c.slug for c in get_sidebar_data()['categories']}
+        tag_slugs = {int(pk): slug for pk, (name, slug) in current['tags'].items()}
+
+        def listing_paths(post_record):
+            category_id, tag_ids = post_record[3], post_record[4]
+            paths = {'/blog/', f'/blog/category/{categories.get(category_id, "no_category")}/'}
+            paths.update(f'/blog/tag/{tag_slugs[tag_id]}/' for tag_id in tag_ids if tag_id in tag_slugs)
+            return paths
+
+        if previous is None:
+            _prepare_output(output)
+            details = list(current['posts'])
+            listings = {'/blog/', '/blog/category/no_category/'}
+            listings.update(f'/blog/category/{slug}/' for slug in categories.values())
+            listings.update(f'/blog/tag/{slug}/' for slug in tag_slugs.values())
+        else:
+            details = set()
+            listings = set()
+            related_by = {}  # 관련 포스트 pk -> 그 포스트를 관련 포스트로 보여주는 포스트들
+            for pk, record in current['posts'].items():
+                for related_id in record[7]:
+                    related_by.setdefault(str(related_id), set()).add(pk)
+            for pk, record in current['posts'].items():
+                if previous['posts'].get(pk) != record:
+                    details.add(pk)
+                    if pk not in previous['posts'] or previous['posts'][pk][0] != record[0]:  # 제목이 바뀌었을 수 있음
+                        details |= related_by.get(pk, set())
+                    listings |= listing_paths(record)
+                    if pk in previous['posts']:  # 예전 카테고리, 태그의 리스트에서도 빠져야 함
+                        listings |= listing_paths(previous['posts'][pk])
+            for pk in set(previous['posts']) - set(current['posts']):  # 지워진 포스트
+                listings |= listing_paths(previous['posts'][pk])
+                shutil.rmtree(os.path.join(output, 'blog', pk), ignore_errors=True)
+            for path in listings:  # 커서가 바뀌므로 예전 커서 페이지는 지움
+                shutil.rmtree(os.path.join(output, path.lstrip('/'), '__after__'), ignore_errors=True)
+
+        detail_paths = [f'/blog/{pk}/' for pk in sorted(details, key=int)]
+        chunks = [detail_paths[i:i + 100] for i in range(0, len(detail_paths), 100)]
+        workers = max(1, options['workers'])
+        if workers == 1:
+            count = sum(render_detail_pages(output, chunk) for chunk in chunks)
+            count += sum(render_listing(output, path, options['max_listing_pages']) for path in sorted(listings))
+        else:
+            _close_connections()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_close_connections) as pool:
+                futures = [pool.submit(render_detail_pages, output, chunk) for chunk in chunks]
+                futures += [
+                    pool.submit(render_listing, output, path, options['max_listing_pages']) for path in sorted(listings)
+                ]
+                count = sum(future.result() for future in futures)
+
+        os.makedirs(output, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False)
+
+        mode = 'full' if previous is None else 'incremental'
+        self.stdout.write(self.style.SUCCESS(f'{count}개의 페이지를 만들었습니다. ({mode})'))
@@ -0,0 +1,107 @@
+"""
+주요 페이지가 실행하는 쿼리의 실행 계획(EXPLAIN)을 확인하는 명령
+
+    python manage.py explain_queries [--min-rows 1000] [--verbose]
+
+benchmark 명령과 같은 URL(+ 리스트 두 번째 페이지, 댓글 페이지)을 요청하면서 실행된 SELECT 쿼리마다 EXPLAIN 을 실행하고
+행이 min-rows 개 이상인 테이블을 인덱스 없이 처음부터 끝까지 읽는(full scan) 쿼리가 있으면 실패함
+행이 적으면 DB 가 일부러 full scan 을 고르기도 하므로 벤치마크 데이터를 넣은 DB 에서 실행해야 의미가 있음
+"""
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from blog.context_processors import clear_sidebar_cache
+from blog.models import Post
+from blog.pagination import CursorPaginator
+from blog.views import PostList
+from .benchmark import hot_urls, benchmark_client
+
+# SQLite: SCAN 은 테이블(또는 인덱스) 전체를 읽음, SEARCH 는 인덱스로 일부만 읽음
+# 인덱스 순서대로 읽는 SCAN ... USING INDEX 는 LIMIT 에서 멈추므로 괜찮지만
+# 그 뒤에 다시 정렬(USE TEMP B-TREE FOR ORDER BY)한다면 결국 모든 행을 읽은 것
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+SQLITE_INDEX_SCAN = re.compile(r'^SCAN (\w+) USING (?:COVERING )?INDEX \w+$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    help = '주요 페이지의 쿼리에 EXPLAIN 을 실행해서 큰 테이블을 full scan 하는 쿼리가 있으면 실패합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000, help='이보다 행이 적은 테이블의 full scan 은 무시')
+        parser.add_argument('--verbose', action='store_true', help='모든 쿼리의 실행 계획을 출력')
+
+    def urls(self):
+        urls = [urls[0] for urls in hot_urls(1).values() if urls]
+        urls.append('/blog/category/no_category/')
+        page = CursorPaginator(Post.objects.all(), PostList.paginate_by, PostList.ordering).page()
+        if page.has_next():  # 두 번째 페이지부터는 커서 조건(WHERE created_at < ...)이 붙음
+            urls.append(f'/blog/?after={page.next_cursor()}')
+        if page.object_list:
+            urls.append(f'{page.object_list[0].get_absolute_url()}comments/')
+        return urls
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+        raise CommandError(f'{connection.vendor} 는 지원하지 않습니다. (sqlite, postgresql)')
+
+    def full_scans(self, sql, plan):
+        # 서브쿼리는 "blog_comment" U0 처럼 별칭으로 나오므로 테이블 이름으로 바꿈
+        aliases = dict((alias, table) for table, alias in re.findall(r'"(\w+)" (U\d+|T\d+)\b', sql))
+        patterns = [POSTGRES_SCAN]
+        if connection.vendor == 'sqlite':
+            patterns = [SQLITE_SCAN]
+            if any('USE TEMP B-TREE FOR ORDER BY' in line for line in plan):
+                patterns.append(SQLITE_INDEX_SCAN)
+        tables = []
+        for line in plan:
+            for pattern in patterns:
+                match = pattern.search(line.strip())
+                if match:
+                    tables.append(aliases.get(match.group(1), match.group(1)))
+        return tables
+
+    def row_count(self, table):
+        if table not in self._row_counts:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                self._row_counts[table] = cursor.fetchone()[0]
+        return self._row_counts[table]
+
+    def handle(self, *args, **options):
+        self._row_counts = {}
+        client = benchmark_client()
+        problems = []
+        for url in self.urls():
+            clear_sidebar_cache()  # 캐시된 사이드바 쿼리도 확인하도록
+            with CaptureQueriesContext(connection) as ctx, override_settings(BLOG_FRAGMENT_CACHE=0):
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+
+            self.stdout.write(f'{url} ({len(ctx.captured_queries)} queries)')
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan = self.explain(sql)
+                scans = [table for table in self.full_scans(sql, plan) if self.row_count(table) >= options['min_rows']]
+                if options['verbose'] or scans:
+                    self.stdout.write(f'  {sql}')
+                    for line in plan:
+                        self.stdout.write(f'    {line}')
+                for table in scans:
+                    problems.append(f'{url}: full scan of {table} ({self.row_count(table)} rows): {sql[:200]}')
+
+        if problems:
+            raise CommandError('큰 테이블을 full scan 하는 쿼리가 있습니다.\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('full scan 하는 쿼리가 없습니다.'))
@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.archive import iter_records, format_markdown
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = '포스트를 JSON Lines 파일이나 마크다운 폴더로 내보냅니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON Lines 파일 경로('-' 이면 표준 출력) 또는 마크다운 파일을 만들 폴더")
+        parser.add_argument('--format', choices=['jsonl', 'markdown'], default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        records = iter_records(Post.objects.all(), batch_size)
+        count = 0
+
+        if options['format'] == 'markdown':
+            os.makedirs(path, exist_ok=True)
+            for record in records:
+                count += 1
+                with open(os.path.join(path, f'{count:06d}.md'), 'w', encoding='utf-8') as f:
+                    f.write(format_markdown(record))
+                if count % batch_size == 0:
+                    self.stderr.write(f'{count}개 내보냄')
+        else:
+            f = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+            try:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    count += 1
+                    if count % batch_size == 0:
+                        self.stderr.write(f'{count}개 내보냄')
+            finally:
+                if f is not sys.stdout:
+                    f.close()
+
+        self.stderr.write(self.style.SUCCESS(f'{count}개의 포스트를 내보냈습니다.'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from blog.caching import bump_version
+from blog.images import generate_variants, delete_variants, VARIANT_FORMATS
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'head_image 의 크기별 WebP/JPEG 파일을 만듭니다. (기본값: 아직 만들지 않은 포스트만)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='이미 만든 포스트도 다시 만듦')
+
+    def handle(self, *args, **options):
+        post_list = Post.objects.exclude(head_image='')
+        if not options['all']:
+            post_list = post_list.filter(head_image_variants={})
+
+        count = 0
+        for post in post_list.only('pk', 'head_image', 'head_image_variants').iterator():
+            try:
+                variants = generate_variants(post.head_image.name)
+            except (OSError, ValueError) as e:  # 파일이 없거나 이미지가 아닌 경우
+                self.stderr.write(f'{post.pk}: {post.head_image.name} ({e})')
+                continue
+            # 다시 만들면서 더 이상 쓰지 않게 된 크기의 파일은 지움
+            delete_variants({
+                fmt: {width: path for width, path in paths.items() if path != variants.get(fmt, {}).get(width)}
+                for fmt, paths in post.head_image_variants.items() if fmt in VARIANT_FORMATS
+            })
+            Post.objects.filter(pk=post.pk).update(head_image_variants=variants)
+            count += 1
+
+        if count:  # update() 는 updated_at 을 바꾸지 않으므로 캐시된 페이지를 직접 무효화
+            bump_version('posts')
+        self.stdout.write(self.style.SUCCESS(f'{count}개 포스트의 이미지를 만들었습니다.'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.archive import read_records, import_batch, finish_import
+
+
+class Command(BaseCommand):
+    help = 'JSON Lines 파일이나 마크다운 폴더에서 포스트, 태그, 카테고리, 댓글을 한꺼번에 가져옵니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines 파일 경로 또는 마크다운(.md) 파일이 있는 폴더')
+        parser.add_argument('--format', choices=['jsonl', 'markdown'], default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        count = 0
+        batch = []
+
+        def flush():
+            nonlocal count
+            count += len(import_batch(batch))
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{count}개 가져옴 ({count / elapsed * 60:.0f} posts/min)')
+
+        for record in read_records(options['path'], options['format']):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+
+        finish_import()
+        self.stdout.write(self.style.SUCCESS(f'{count}개의 포스트를 가져왔습니다.'))
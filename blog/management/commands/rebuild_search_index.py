@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = '모든 포스트의 검색 색인을 처음부터 다시 만듭니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild(Post.objects.all(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{backend.__class__.__name__}: {count}개의 포스트를 색인했습니다.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog.counters import reconcile_comment_counts, reconcile_tag_counts, reconcile_category_counts
+from blog.context_processors import clear_sidebar_cache
+from blog.caching import bump_version
+
+
+class Command(BaseCommand):
+    help = 'signals 로 관리하는 댓글 수, 태그/카테고리별 포스트 수 카운터를 실제 값과 맞춥니다.'
+
+    def handle(self, *args, **options):
+        fixed = {
+            'Post.comment_count': reconcile_comment_counts(),
+            'Tag.post_count': reconcile_tag_counts(),
+            'Category.post_count': reconcile_category_counts(),
+        }
+        if any(fixed.values()):  # 캐시된 페이지와 사이드바에 남은 틀린 숫자도 지움
+            clear_sidebar_cache()
+            bump_version('posts', 'sidebar', 'tags')
+        for name, count in fixed.items():
+            self.stdout.write(self.style.SUCCESS(f'{name}: {count}개를 고쳤습니다.'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from blog.caching import bump_version
+from blog.models import Post, MARKDOWN_RENDER_VERSION
+
+
+class Command(BaseCommand):
+    help = '저장된 포스트의 마크다운 HTML을 다시 렌더링합니다. (기본값: 렌더러 버전이 다른 포스트만)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='버전과 상관없이 모든 포스트를 다시 렌더링')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        post_list = Post.objects.all()
+        if not options['all']:
+            post_list = post_list.filter(~Q(content_html_version=MARKDOWN_RENDER_VERSION))
+
+        # bulk_update 를 사용하면 updated_at(auto_now) 이 바뀌지 않음
+        fields = ['content_html', 'excerpt_html', 'content_html_version']
+        batch = []
+        count = 0
+        for post in post_list.only('pk', 'content').order_by('pk').iterator(chunk_size=batch_size):
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                Post.objects.bulk_update(batch, fields)
+                count += len(batch)
+                batch = []
+        if batch:
+            Post.objects.bulk_update(batch, fields)
+            count += len(batch)
+        if count:  # updated_at 이 그대로이므로 리스트, 상세, 피드의 ETag 와 캐시는 버전으로 바꿈
+            bump_version('posts')
+
+        self.stdout.write(self.style.SUCCESS(f'{count}개의 포스트를 렌더링했습니다.'))
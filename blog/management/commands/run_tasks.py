@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.models import Job
+from blog.tasks import run_pending, requeue_stale, task_stats
+
+
+class Command(BaseCommand):
+    help = '작업 큐(Job)에 쌓인 작업을 실행하는 워커입니다. 여러 개를 동시에 실행해도 됩니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='대기 중인 작업만 실행하고 끝냄')
+        parser.add_argument('--sleep', type=float, default=1.0, help='작업이 없을 때 기다리는 시간(초)')
+        parser.add_argument('--stats', action='store_true', help='작업 이름별 개수와 실행 시간만 보여줌')
+        parser.add_argument('--prune-days', type=int, default=7, help='이 날짜보다 오래된 완료 작업은 지움')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, stat in sorted(task_stats().items()):
+                counts = ', '.join(f'{status}={stat.get(status, 0)}' for status, _ in Job.STATUS_CHOICES)
+                timing = f'avg={stat["avg_ms"]:.1f}ms max={stat["max_ms"]:.1f}ms' if stat['avg_ms'] is not None else ''
+                self.stdout.write(f'{name}: {counts} {timing}')
+            return
+
+        Job.objects.filter(
+            status=Job.DONE, finished_at__lt=timezone.now() - timedelta(days=options['prune_days'])
+        ).delete()
+
+        try:
+            while True:
+                requeue_stale()
+                count = run_pending()
+                if count:
+                    self.stdout.write(f'{count}개의 작업을 실행했습니다.')
+                if options['once']:
+                    return
+                if not count:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
@@ -3,11 +3,36 @@ import os
 from django.contrib.auth.models import User
 from markdownx.models import MarkdownxField
 from markdownx.utils import markdown
+from django.utils import timezone
+from django.utils.text import Truncator
+from django.core.files.storage import default_storage
+from .images import build_srcset
+from .profiling import timed
 
+# 마크다운 렌더러(markdownx 설정, 확장 등)가 바뀌면 이 값을 올려서 저장된 HTML을 다시 만들도록 함
+MARKDOWN_RENDER_VERSION = 1
+EXCERPT_WORDS = 50  # 리스트 카드에 보여줄 요약 단어 수
 
-class Tag(models.Model):
+
+class CounterFieldsMixin:
+    """signals 나 조회수 flush 가 DB 에서 더하는 카운터는 불러온 뒤에 바뀌었을 수 있으므로 save() 로 덮어쓰지 않음"""
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super(CounterFieldsMixin, self).save(*args, **kwargs)
+
+
+class Tag(CounterFieldsMixin, models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # signals 에서 관리하는 포스트 수
+
+    counter_fields = ('post_count',)
 
     def __str__(self):
         return self.name
@@ -16,12 +41,15 @@ class Tag(models.Model):
         return f'/blog/tag/{self.slug}/'
 
 
-class Category(models.Model):
+class Category(CounterFieldsMixin, models.Model):
     name = models.CharField(max_length=50, unique=True)
     # 카테고리의 이름을 담는 필드, unique=True로 하여 같은 이름의 카테고리를 만들지 못하도록 함
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
 
     # 슬러그 필드, allow_unicode=True로 한글도 사용할 수 있도록 함
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # signals 에서 관리하는 포스트 수
+
+    counter_fields = ('post_count',)
 
     def __str__(self):
         return self.name
@@ -33,12 +61,19 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'
 
 
-class Post(models.Model):  # models 모듈의 Model 클래스를 상속해 만든 것.
+class PostQuerySet(models.QuerySet):
+    def for_list(self):  # 포스트 카드에서 쓰는 작성자, 카테고리, 태그를 한 번에 가져옴
+        return self.select_related('author', 'category').prefetch_related('tags')
+
+
+class Post(CounterFieldsMixin, models.Model):  # models 모듈의 Model 클래스를 상속해 만든 것.
     title = models.CharField(max_length=30)
     hook_text = models.CharField(max_length=100, blank=True)
     content = MarkdownxField()
 
     head_image = models.ImageField(upload_to='blog/images/%Y/%m/%d', blank=True)
+    # head_image 를 줄인 WebP/JPEG 파일 경로, {'webp': {'400': 경로, ...}, 'jpeg': {...}}
+    head_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     file_upload = models.FileField(upload_to='blog/files/%Y/%m/%d', blank=True)
     # 아래의 코드는 자동으로 생성일시, 수정일시를 표현할 수 있도록 해 줍니다.
     created_at = models.DateTimeField(auto_now_add=True)  # 생성일자를 표현할 때: auto_now_add
@@ -50,20 +85,84 @@ class Post(models.Model):  # models 모듈의 Model 클래스를 상속해 만
 
     tags = models.ManyToManyField(Tag, blank=True)
 
+    # 마크다운을 매번 변환하지 않도록 저장할 때 미리 렌더링해 둔 HTML
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt_html = models.TextField(blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # 댓글 수를 매번 COUNT 하지 않도록 signals 에서 갱신하는 값
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # 조회수, 요청마다 쓰지 않고 blog.view_counts 가 프로세스마다 모아 두었다가 한꺼번에 더함
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+    counter_fields = ('comment_count', 'view_count')
+
     def __str__(self):
         return f'[{self.pk}] {self.title} :: {self.author}'  # 파이썬 3.6부터 생긴 포매팅 방법.
 
     def get_absolute_url(self):
         return f'/blog/{self.pk}/'
 
+    def get_head_image_srcset_webp(self):
+        return build_srcset(self.head_image_variants.get('webp', {}))
+
+    def get_head_image_srcset_jpeg(self):
+        return build_srcset(self.head_image_variants.get('jpeg', {}))
+
+    def get_head_image_src(self):  # srcset 을 모르는 브라우저용, 800px 이하 중 가장 큰 JPEG 또는 원본
+        paths = self.head_image_variants.get('jpeg', {})
+        widths = [int(width) for width in paths if int(width) <= 800]
+        if widths:
+            return default_storage.url(paths[str(max(widths))])
+        return self.head_image.url
+
+    def get_placeholder_url(self):  # 이미지가 없는 포스트에 보여줄 자리 표시 이미지
+        return f'/blog/placeholder/{self.pk}/800x500.svg'
+
     def get_file_name(self):
         return os.path.basename(self.file_upload.name)
 
     def get_file_ext(self):
         return self.get.file_name().split('.')[-1]
 
-    def get_content_markdown(self):  # 마크다운 문법을 HTML로 변환
-        return markdown(self.content)
+    def render_content(self):  # 마크다운 문법을 HTML로 변환해서 필드에 담아 둠
+        self.content_html = markdown(self.content)
+        self.excerpt_html = Truncator(self.content_html).words(EXCERPT_WORDS, html=True, truncate=' …')
+        self.content_html_version = MARKDOWN_RENDER_VERSION
+
+    def is_content_rendered(self):
+        return self.content_html_version == MARKDOWN_RENDER_VERSION
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'content_html', 'excerpt_html', 'content_html_version'}
+        super(Post, self).save(*args, **kwargs)
+
+    @timed('markdown')
+    def get_content_markdown(self):  # 미리 렌더링한 HTML, 렌더러 버전이 다르면 다시 변환
+        if not self.is_content_rendered():
+            self.render_content()
+        return self.content_html
+
+    def get_content_excerpt(self):  # 리스트 카드용 요약 HTML
+        if not self.is_content_rendered():
+            self.render_content()
+        return self.excerpt_html
+
+    class Meta:
+        indexes = [
+            # 리스트 페이지: ORDER BY created_at DESC, id DESC (커서 페이지네이션의 키)
+            models.Index(fields=['-created_at', '-id']),
+            # 카테고리 페이지(미분류는 category IS NULL), 작성자별 목록: 거른 뒤 같은 순서로 정렬
+            models.Index(fields=['category', '-created_at', '-id']),
+            models.Index(fields=['author', '-created_at', '-id']),
+            # 많이 읽은 글: ORDER BY view_count DESC, id DESC LIMIT n
+            models.Index(fields=['-view_count', '-id']),
+        ]
 
 
 class Comment(models.Model):
@@ -79,8 +178,68 @@ class Comment(models.Model):
     def get_absolute_url(self):
         return f'{self.post.get_absolute_url()}#comment-{self.pk}'
 
-    def get_avatar_url(self):
-        if self.author.socialaccount_set.exists():
-            return self.author.socialaccount_set.first().get_avatar_url()
-        else:
-            return 'https://picsum.photos/id/237/200/300'
+    def get_avatar_url(self):  # 뷰에서 attach_avatar_urls 로 채워 두었다면 쿼리 없이 돌려줌
+        if not hasattr(self, 'avatar_url'):
+            from .avatars import get_avatar_urls
+            self.avatar_url = get_avatar_urls([self.author_id])[self.author_id]
+        return self.avatar_url
+
+    class Meta:
+        indexes = [
+            # 댓글 페이지: post_id = ? ORDER BY id (외래키 인덱스로 충분)
+            # 상세 페이지 ETag: post_id = ? 인 댓글의 MAX(modified_at) 을 테이블을 읽지 않고 계산
+            models.Index(fields=['post', 'modified_at']),
+        ]
+
+
+class PostSearchIndex(models.Model):
+    """blog.search.SQLiteFTSBackend 의 FTS5 색인 테이블(rowid = 포스트 pk), 검색할 때 포스트와 조인하기 위한 것"""
+    post = models.OneToOneField(
+        Post, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_index'
+    )
+
+    class Meta:
+        managed = False  # 테이블은 blog.search 가 migrate 뒤에 만듦
+        db_table = 'blog_post_fts'
+
+
+class RelatedPost(models.Model):
+    """blog.related 가 태그로 미리 계산해 둔 포스트별 관련 포스트 상위 N 개"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()  # 0 부터, 점수가 높은 순서
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+    class Meta:
+        constraints = [
+            # 상세 페이지: post_id = ? ORDER BY rank 를 이 인덱스만으로 읽음
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank'),
+        ]
+
+
+class Job(models.Model):
+    """blog.tasks 로 등록한 작업을 나중에 run_tasks 명령(워커)이 실행하도록 쌓아 두는 큐"""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    key = models.CharField(max_length=255, db_index=True)  # 같은 작업이 대기 중이면 다시 넣지 않기 위한 키
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'[{self.pk}] {self.name}{tuple(self.args)} :: {self.status}'
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
@@ -0,0 +1,122 @@
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):  # 이 페이지의 마지막 포스트 다음부터 (Older)
+        return self.paginator.encode_cursor(self.object_list[-1]) if self._has_next else None
+
+    def previous_cursor(self):  # 이 페이지의 첫 포스트 이전까지 (Newer)
+        return self.paginator.encode_cursor(self.object_list[0]) if self._has_previous else None
+
+
+class CursorPaginator:
+    """
+    OFFSET 대신 마지막으로 본 포스트의 정렬 키 값(keyset)을 기준으로 다음 페이지를 가져오는 페이지네이터
+    ordering 은 유일해야 하므로 마지막 필드는 pk 로 둠, 예) ('-created_at', '-pk')
+    페이지가 아무리 뒤에 있어도 인덱스를 타고 per_page + 1 개만 읽음
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    @property
+    def count(self):  # 전체 개수가 필요할 때에만 COUNT 쿼리를 실행
+        if not hasattr(self, '_count'):
+            self._count = self.queryset.count()
+        return self._count
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        data = json.dumps(values, default=lambda value: value.isoformat())
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def get_field(self, name):  # 정렬 키의 모델 필드, annotate 로 만든 값이면 그 output_field
+        if name == 'pk':
+            return self.queryset.model._meta.pk
+        if name in self.queryset.query.annotations:
+            return self.queryset.query.annotations[name].output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, cursor):
+        # 커서는 사용자가 바꿀 수 있으므로 값의 개수와 형식을 정렬 키의 필드로 확인하고 변환함
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            if any(isinstance(value, bool) or not isinstance(value, (str, int, float)) for value in values):
+                raise ValueError
+            return [
+                self.get_field(field.lstrip('-')).to_python(value) for field, value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise Http404('잘못된 페이지 커서입니다.')
+
+    def keyset_filter(self, values, reverse=False):
+        # (a, b) 다음 => a > x OR (a = x AND b > y), 내림차순 필드는 부등호 방향이 반대
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition = {f'{name}__lt' if descending else f'{name}__gt': values[i]}
+            for prev_field, prev_value in zip(self.ordering[:i], values[:i]):
+                condition[prev_field.lstrip('-')] = prev_value
+            conditions.append(Q(**condition))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def page(self, after=None, before=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if before:
+            reversed_ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+            queryset = queryset.filter(self.keyset_filter(self.decode_cursor(before), reverse=True))
+            object_list = list(queryset.order_by(*reversed_ordering)[:self.per_page + 1])
+            has_previous = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page][::-1]
+            return CursorPage(self, object_list, has_next=True, has_previous=has_previous)
+
+        if after:
+            queryset = queryset.filter(self.keyset_filter(self.decode_cursor(after)))
+        object_list = list(queryset[:self.per_page + 1])
+        has_next = len(object_list) > self.per_page
+        return CursorPage(self, object_list[:self.per_page], has_next=has_next, has_previous=bool(after))
+
+
+def paginate_by_cursor(request, queryset, per_page, ordering=('-created_at', '-pk')):
+    """?after=, ?before= 쿼리스트링으로 페이지를 고르고 ListView 와 같은 이름의 컨텍스트를 돌려줌"""
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'post_list': page.object_list,
+    }
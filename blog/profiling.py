@@ -0,0 +1,227 @@
+"""
+요청마다 시간이 어디에 쓰이는지 기록하는 미들웨어
+
+뷰마다 전체 시간, DB 쿼리 수와 시간, 템플릿 렌더링 시간, 마크다운 변환 시간을 모아서
+ - 응답의 Server-Timing 헤더로 보여주고 (브라우저 개발자 도구의 Timing 탭에서 볼 수 있음)
+ - 최근 BLOG_PERF_WINDOW 개 요청의 백분위 수를 /blog/perf/ (스태프만) 에서 JSON 으로 보여줌
+느린 쿼리와 같은 쿼리가 한 요청에서 여러 번 반복되는 N+1 패턴은 뷰 이름, 템플릿 줄과 함께 로그로 남김
+통계는 프로세스마다 따로 모임, settings.BLOG_PERF_ENABLED 가 False 이면 미들웨어와 템플릿 시간 측정을 모두 끔
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict, deque, Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node, Template
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('blog_request_profile', default=None)
+
+METRICS = ('total', 'db', 'queries', 'template', 'markdown')
+UNRESOLVED = '<unresolved>'  # URL 을 찾지 못한 요청(404 등)은 주소마다 따로 모으지 않고 여기에 모음
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _template_location():
+    """쿼리를 실행한 템플릿 이름과 줄 번호, 템플릿 밖에서 실행된 쿼리면 None"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and getattr(node, 'token', None) is not None:
+            return f'{node.origin.template_name or node.origin.name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    def __init__(self, name):
+        self.name = name
+        self.times = defaultdict(float)  # ms
+        self.queries = 0
+        self.query_counts = Counter()
+        self.template_depth = 0
+        self._lock = threading.Lock()  # 비동기 뷰에서는 여러 스레드가 동시에 쿼리를 실행함
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.times['db'] += duration
+                self.queries += 1
+                self.query_counts[sql] += 1
+
+            if duration >= _setting('BLOG_PERF_SLOW_QUERY_MS', 100):
+                logger.warning('slow query (%.1fms) in %s at %s: %s',
+                               duration, self.name, _template_location() or 'view', sql)
+            # 같은 쿼리가 기준 횟수에 닿는 순간 한 번만 기록
+            if self.query_counts[sql] == _setting('BLOG_PERF_N_PLUS_ONE', 5):
+                logger.warning('possible N+1 query (%d times) in %s at %s: %s',
+                               self.query_counts[sql], self.name, _template_location() or 'view', sql)
+
+    @contextmanager
+    def timer(self, metric):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.times[metric] += (time.perf_counter() - started) * 1000
+
+    def as_dict(self):
+        return {**{metric: self.times[metric] for metric in ('total', 'db', 'template', 'markdown')},
+                'queries': self.queries}
+
+    def server_timing(self):
+        return ', '.join([
+            f'total;dur={self.times["total"]:.1f}',
+            f'db;dur={self.times["db"]:.1f};desc="{self.queries} queries"',
+            f'template;dur={self.times["template"]:.1f}',
+            f'markdown;dur={self.times["markdown"]:.1f}',
+        ])
+
+
+@contextmanager
+def capture_queries():
+    """
+    DB 연결은 스레드마다 따로 있으므로, 요청을 기록하는 중이면 지금 스레드의 연결에서 실행하는 쿼리도 기록에 포함
+    (비동기 뷰가 sync_to_async 로 다른 스레드에서 쿼리를 실행할 때)
+    """
+    request_profile = _current.get()
+    with ExitStack() as stack:
+        if request_profile is not None:
+            for connection in connections.all():
+                if request_profile.execute_wrapper not in connection.execute_wrappers:
+                    stack.enter_context(connection.execute_wrapper(request_profile.execute_wrapper))
+        yield
+
+
+@contextmanager
+def profile(name):
+    """with 블록 안에서 실행한 쿼리, 템플릿, 마크다운 시간을 RequestProfile 에 모음"""
+    request_profile = RequestProfile(name)
+    token = _current.set(request_profile)
+    try:
+        with capture_queries(), request_profile.timer('total'):
+            yield request_profile
+    finally:
+        _current.reset(token)
+
+
+def timed(metric):
+    """요청을 기록하는 중이면 함수에서 쓴 시간을 metric 에 더함"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request_profile = _current.get()
+            if request_profile is None:
+                return func(*args, **kwargs)
+            with request_profile.timer(metric):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_template_render = Template.render
+
+
+def _profiled_template_render(self, context):
+    request_profile = _current.get()
+    if request_profile is None or request_profile.template_depth:  # include 된 템플릿은 바깥 템플릿 시간에 포함
+        return _template_render(self, context)
+    request_profile.template_depth += 1
+    try:
+        with request_profile.timer('template'):
+            return _template_render(self, context)
+    finally:
+        request_profile.template_depth -= 1
+
+
+def install_template_timer():
+    # Template.render 를 바꾸므로 프로파일링을 켠 경우에만 미들웨어가 한 번 설치함
+    if Template.render is not _profiled_template_render:
+        Template.render = _profiled_template_render
+
+
+# 최근 요청들의 통계
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=_setting('BLOG_PERF_WINDOW', 500)))
+
+
+def record(name, request_profile):
+    with _lock:
+        _samples[name].append(request_profile.as_dict())
+
+
+def _percentile(values, percent):  # nearest-rank
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def get_stats():
+    """{뷰 이름: {'count': n, 'total': {'p50': ms, 'p90': ms, 'p99': ms, 'max': ms}, 'db': {...}, ...}}"""
+    with _lock:
+        samples = {name: list(rows) for name, rows in _samples.items()}
+    stats = {}
+    for name, rows in sorted(samples.items()):
+        stats[name] = {'count': len(rows)}
+        for metric in METRICS:
+            values = sorted(row[metric] for row in rows)
+            stats[name][metric] = {f'p{p}': round(_percentile(values, p), 2) for p in (50, 90, 99)}
+            stats[name][metric]['max'] = round(values[-1], 2)
+    return stats
+
+
+def reset_stats():
+    with _lock:
+        _samples.clear()
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting('BLOG_PERF_ENABLED', True):
+            raise MiddlewareNotUsed
+        install_template_timer()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):  # ASGI 에서는 이 미들웨어도 코루틴으로 동작
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with profile(UNRESOLVED) as request_profile:
+            response = self.get_response(request)
+        return self.finish(request_profile, response)
+
+    async def __acall__(self, request):
+        with profile(UNRESOLVED) as request_profile:
+            response = await self.get_response(request)
+        return self.finish(request_profile, response)
+
+    def finish(self, request_profile, response):
+        record(request_profile.name, request_profile)
+        if _setting('BLOG_PERF_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = request_profile.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # URL 을 찾은 뒤부터는 뷰 이름으로 기록
+        request_profile = _current.get()
+        if request_profile is not None:
+            request_profile.name = request.resolver_match.view_name
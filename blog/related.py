@@ -0,0 +1,168 @@
+"""
+태그로 계산하는 관련 포스트
+
+포스트 x 태그 행렬(태그가 달렸으면 1)에서 두 포스트의 코사인 유사도
+    score(a, b) = 겹치는 태그 수 / sqrt(a 의 태그 수 * b 의 태그 수)
+가 높은 순서로 settings.BLOG_RELATED_POSTS 개를 RelatedPost 테이블에 저장해 두고
+상세 페이지에서는 인덱스를 타는 쿼리 한 번으로 읽음
+
+ - 전체 계산: `python manage.py build_related_posts`, NumPy/SciPy 가 있으면 희소 행렬 곱으로 계산하고
+   없으면 같은 점수를 태그별 포스트 목록(역색인)으로 계산함
+ - 부분 계산: 포스트의 태그가 바뀌면 그 포스트와 태그를 하나라도 함께 가진 포스트의 점수만 바뀌므로
+   signals 에서 update_related_posts 작업으로 그 포스트들만 다시 계산함
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .caching import bump_version
+from .models import Post, RelatedPost
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # 선택 의존성
+    np = sparse = None
+
+BATCH_SIZE = 1000  # 행렬 곱을 이만큼의 행씩 나눠서 계산 (메모리)
+
+
+def get_related_posts(post):
+    return [
+        row.related for row in
+        RelatedPost.objects.filter(post=post).select_related('related').order_by('rank')
+    ]
+
+
+def _limit():
+    return getattr(settings, 'BLOG_RELATED_POSTS', 5)
+
+
+def _load(posts=None):
+    """
+    계산할 포스트의 태그, 그 태그가 달린 포스트(후보), 후보마다 태그 수를 돌려줌
+    posts 는 포스트 pk 를 돌려주는 서브쿼리, None 이면 모든 포스트
+    부분 계산에서는 posts 와 태그를 함께 가진 포스트의 연결만 읽고, pk 목록은 서브쿼리로 넘겨 IN 절이 길어지지 않게 함
+    """
+    links = Post.tags.through.objects.order_by()
+    if posts is None:
+        rows = list(links.values_list('post_id', 'tag_id'))
+        candidate_rows = rows
+        sizes = Counter(post_id for post_id, _ in rows)
+    else:
+        rows = list(links.filter(post__in=posts).values_list('post_id', 'tag_id'))
+        candidate_links = links.filter(tag__in=links.filter(post__in=posts).values('tag_id'))
+        candidate_rows = list(candidate_links.values_list('post_id', 'tag_id'))
+        sizes = dict(
+            links.filter(post__in=candidate_links.values('post_id'))
+            .values_list('post_id').annotate(Count('pk'))
+        )
+
+    post_tags = defaultdict(list)
+    for post_id, tag_id in rows:
+        post_tags[post_id].append(tag_id)
+    tag_posts = defaultdict(list)
+    for post_id, tag_id in candidate_rows:
+        tag_posts[tag_id].append(post_id)
+    return post_tags, tag_posts, sizes
+
+
+def _top(post_id, scores, limit):  # 점수가 같으면 최근 포스트(pk 가 큰 것)를 먼저
+    scores.pop(post_id, None)
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+
+
+def score_python(post_tags, tag_posts, sizes, limit):
+    related = {}
+    for post_id, tag_ids in post_tags.items():
+        overlap = defaultdict(int)
+        for tag_id in tag_ids:
+            for other in tag_posts[tag_id]:
+                overlap[other] += 1
+        size = sizes[post_id]
+        scores = {other: n / math.sqrt(size * sizes[other]) for other, n in overlap.items()}
+        related[post_id] = _top(post_id, scores, limit)
+    return related
+
+
+def score_sparse(post_tags, tag_posts, sizes, limit):
+    # 행: 계산할 포스트, 열: 후보 포스트, A(행 x 태그) @ B(후보 x 태그).T 가 겹치는 태그 수
+    tag_index = {tag_id: i for i, tag_id in enumerate(tag_posts)}
+    candidates = sorted({post_id for post_ids in tag_posts.values() for post_id in post_ids})
+    candidate_index = {post_id: i for i, post_id in enumerate(candidates)}
+    b_rows = [candidate_index[post_id] for post_ids in tag_posts.values() for post_id in post_ids]
+    b_cols = [tag_index[tag_id] for tag_id, post_ids in tag_posts.items() for _ in post_ids]
+    b = sparse.csr_matrix((np.ones(len(b_rows)), (b_rows, b_cols)), shape=(len(candidates), len(tag_index)))
+    bt = b.T.tocsr()
+    candidate_ids = np.array(candidates)
+    candidate_sizes = np.array([sizes[post_id] for post_id in candidates], dtype=float)
+
+    related = {}
+    post_ids = list(post_tags)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        batch = post_ids[start:start + BATCH_SIZE]
+        a_rows = [i for i, post_id in enumerate(batch) for _ in post_tags[post_id]]
+        a_cols = [tag_index[tag_id] for post_id in batch for tag_id in post_tags[post_id]]
+        a = sparse.csr_matrix((np.ones(len(a_rows)), (a_rows, a_cols)), shape=(len(batch), len(tag_index)))
+        overlap = (a @ bt).tocsr()
+        for i, post_id in enumerate(batch):
+            cols = overlap.indices[overlap.indptr[i]:overlap.indptr[i + 1]]
+            scores = overlap.data[overlap.indptr[i]:overlap.indptr[i + 1]] / np.sqrt(
+                float(sizes[post_id]) * candidate_sizes[cols]
+            )
+            others = candidate_ids[cols]
+            keep = others != post_id
+            scores, others = scores[keep], others[keep]
+            if len(scores) > limit:  # 상위 limit 개만 남긴 뒤 정렬 (같은 점수는 아래에서 pk 로 정렬)
+                cut = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+                keep = scores >= cut
+                scores, others = scores[keep], others[keep]
+            order = np.lexsort((-others, -scores))[:limit]
+            related[post_id] = [(int(others[j]), float(scores[j])) for j in order]
+    return related
+
+
+def score(post_tags, tag_posts, sizes, limit):
+    engine = score_sparse if sparse is not None else score_python
+    return engine(post_tags, tag_posts, sizes, limit)
+
+
+def _save(related, post_ids=None):  # post_ids 의 관련 포스트를 바꿈, None 이면 모두
+    with transaction.atomic():
+        if post_ids is None:
+            RelatedPost.objects.all().delete()
+        for start in range(0, len(post_ids or ()), BATCH_SIZE):
+            RelatedPost.objects.filter(post__in=post_ids[start:start + BATCH_SIZE]).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=post_id, related_id=other, score=value, rank=rank)
+            for post_id, rows in related.items()
+            for rank, (other, value) in enumerate(rows)
+        ], batch_size=BATCH_SIZE)
+    bump_version('related')
+
+
+def build_related_posts():
+    """모든 포스트의 관련 포스트를 다시 계산, 계산한 포스트 수를 돌려줌"""
+    post_tags, tag_posts, sizes = _load()
+    related = score(post_tags, tag_posts, sizes, _limit())
+    _save(related)
+    return len(related)
+
+
+def update_related_posts(post_ids, tag_ids=()):
+    """
+    태그가 바뀐 포스트(post_ids)와 그 포스트의 지금 태그 또는 바뀐 태그(tag_ids)를 함께 가진 포스트만 다시 계산
+    태그가 모두 지워진 포스트는 관련 포스트가 없어짐
+    """
+    links = Post.tags.through.objects.order_by()
+    posts = links.filter(
+        Q(post__in=post_ids) | Q(tag__in=tag_ids) | Q(tag__in=links.filter(post__in=post_ids).values('tag_id'))
+    ).values('post_id')
+    affected = sorted(set(post_ids) | set(posts.values_list('post_id', flat=True)))
+    post_tags, tag_posts, sizes = _load(posts)
+    related = score(post_tags, tag_posts, sizes, _limit())
+    _save(related, affected)
+    return len(affected)
@@ -0,0 +1,138 @@
+import re
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+
+class BaseSearchBackend:
+    """포스트 검색 백엔드의 공통 인터페이스. BLOG_SEARCH_BACKEND 설정으로 바꿀 수 있음"""
+
+    ordering = ('-created_at', '-pk')  # search() 결과의 정렬 순서, 커서 페이지네이션의 키로도 쓰임
+
+    def search(self, queryset, q):  # 검색어와 일치하는 포스트를 관련도 순으로 정렬한 queryset 을 돌려줌
+        raise NotImplementedError
+
+    def setup(self, using):  # 검색에 필요한 테이블 등을 만듦, migrate 뒤에 한 번 불림
+        pass
+
+    def index_post(self, post):
+        pass
+
+    def index_posts(self, posts):  # 여러 포스트를 한 번에 색인, 태그는 prefetch 되어 있어야 함
+        for post in posts:
+            self.index_post(post)
+
+    def remove_post(self, pk):
+        pass
+
+    def rebuild(self, queryset, batch_size=500):
+        # pk 순서로 잘라서 태그를 prefetch 하며 색인, 메모리 사용량이 포스트 수에 비례하지 않음
+        count = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').prefetch_related('tags')[:batch_size])
+            if not batch:
+                return count
+            self.index_posts(batch)
+            count += len(batch)
+            last_pk = batch[-1].pk
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """별도의 색인 없이 LIKE 로 검색하는 백엔드, 전문 검색을 지원하지 않는 DB 를 위한 것"""
+
+    def search(self, queryset, q):
+        return queryset.filter(
+            Q(title__icontains=q) | Q(hook_text__icontains=q) | Q(content__icontains=q) | Q(tags__name__icontains=q)
+        ).distinct().order_by(*self.ordering)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 역색인 테이블(rowid = 포스트 pk)로 검색하고 bm25 점수로 정렬하는 백엔드"""
+
+    table = 'blog_post_fts'
+    ordering = ('search_rank', '-pk')
+    _ready = set()  # 색인 테이블을 확인한 DB (별칭, 이름), 프로세스마다 한 번만 확인함
+
+    def setup(self, using):
+        db = connections[using]
+        if db.vendor != 'sqlite':
+            return
+        with db.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                f'USING fts5(title, hook_text, content, tags, tokenize="unicode61")'
+            )
+        self._ready.add((db.alias, db.settings_dict['NAME']))
+
+    def ensure_table(self):
+        # 보통은 migrate 뒤에 post_migrate 에서 만들어 두므로, 여기서는 처음 한 번만 확인함
+        if (connection.alias, connection.settings_dict['NAME']) not in self._ready:
+            self.setup(connection.alias)
+
+    def get_match_query(self, q):
+        # 한국어 조사가 붙은 단어("러스트에")도 찾을 수 있도록 단어마다 접두어 검색으로 만듦
+        words = re.findall(r'\w+', q)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, queryset, q):
+        match_query = self.get_match_query(q)
+        if not match_query:  # 단어가 없는 검색어(문장부호만 있는 경우 등), 정렬 키는 그대로 있어야 함
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        self.ensure_table()
+        # 색인 테이블(PostSearchIndex)과 조인해서 MATCH 한 번으로 거름
+        # bm25 는 MATCH 와 같은 쿼리에서만 구할 수 있고(서브쿼리로 구하면 행마다 색인 통계를 다시 계산함),
+        # 점수가 낮을수록 관련도가 높음, 커서 페이지네이션의 키로 쓸 수 있도록 annotate 로 둠
+        return queryset.filter(search_index__isnull=False).filter(
+            RawSQL(f'{self.table} MATCH %s', [match_query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'bm25({self.table})', [], output_field=FloatField())
+        ).order_by(*self.ordering)
+
+    def index_post(self, post):
+        self.index_posts([post])
+
+    def index_posts(self, posts):
+        self.ensure_table()
+        rows = [
+            (post.pk, post.title, post.hook_text, strip_tags(post.get_content_markdown()),
+             ' '.join(tag.name for tag in post.tags.all()))
+            for post in posts
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, hook_text, content, tags) VALUES (%s, %s, %s, %s, %s)', rows
+            )
+
+    def remove_post(self, pk):
+        self.ensure_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def rebuild(self, queryset, batch_size=500):
+        self.ensure_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        count = super(SQLiteFTSBackend, self).rebuild(queryset, batch_size)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return count
+
+
+def create_search_tables(using, **kwargs):  # post_migrate
+    if router.allow_migrate(using, 'blog'):
+        get_search_backend().setup(using)
+
+
+def get_search_backend():
+    backend_path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
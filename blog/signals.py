@@ -0,0 +1,147 @@
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
+from django.db.models import F
+from django.dispatch import receiver
+from allauth.socialaccount.models import SocialAccount
+
+from .models import Post, Category, Tag, Comment
+from .context_processors import clear_sidebar_cache
+from .caching import bump_version
+from .avatars import clear_avatar_cache
+from .tasks import enqueue
+from .sitemaps import bump_post_shard
+
+
+@receiver(post_init, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    # 저장할 때 카테고리가 바뀌었는지 비교하기 위해 불러올 때의 카테고리를 기억해 둠
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+    instance._loaded_head_image = _image_name(instance.__dict__.get('head_image'))
+
+
+def _image_name(value):  # FieldFile 또는 문자열에서 파일 경로만 꺼냄
+    return getattr(value, 'name', value) or ''
+
+
+def _add_post_count(model, pks, n):
+    # F() 로 DB 에서 더하므로 동시에 여러 요청이 바꿔도 값이 정확함
+    pks = [pk for pk in pks if pk is not None]
+    if pks and n > 0:
+        model.objects.filter(pk__in=pks).update(post_count=F('post_count') + n)
+    elif pks and n < 0:
+        model.objects.filter(pk__in=pks, post_count__gte=-n).update(post_count=F('post_count') + n)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created or instance.category_id != instance._loaded_category_id:
+        if created:
+            _add_post_count(Category, [instance.category_id], 1)
+        else:
+            _add_post_count(Category, [instance._loaded_category_id], -1)
+            _add_post_count(Category, [instance.category_id], 1)
+        clear_sidebar_cache()
+        bump_version('posts', 'sidebar')
+    else:
+        bump_version('posts')
+    instance._loaded_category_id = instance.category_id
+    bump_post_shard(instance.pk)  # 이 포스트가 들어 있는 사이트맵 조각만 다시 만들도록
+    # 이미지 만들기와 검색 색인은 작업 큐로 넘겨서 요청을 빨리 끝냄
+    if _image_name(instance.head_image) != instance._loaded_head_image:
+        instance._loaded_head_image = _image_name(instance.head_image)
+        enqueue('update_head_image_variants', instance.pk)
+    enqueue('index_post', instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # 태그 연결(through) 행은 m2m_changed 없이 함께 지워지므로 지워지기 전에 태그별 포스트 수를 줄임
+    instance._deleted_tag_ids = list(Post.tags.through.objects.filter(post=instance).values_list('tag_id', flat=True))
+    _add_post_count(Tag, instance._deleted_tag_ids, -1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _add_post_count(Category, [instance.category_id], -1)
+    clear_sidebar_cache()
+    bump_version('posts', 'sidebar', 'tags')
+    bump_post_shard(instance.pk)
+    enqueue('delete_head_image_variants', instance.head_image_variants)
+    enqueue('remove_post_index', instance.pk)
+    if getattr(instance, '_deleted_tag_ids', None):  # 같은 태그를 가진 포스트의 관련 포스트에서 빠짐
+        enqueue('update_related_posts', [], instance._deleted_tag_ids)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_counted(sender, instance, action, reverse, pk_set, **kwargs):
+    # 태그별 포스트 수, remove 의 pk_set 에는 연결되지 않은 pk 도 들어올 수 있으므로 실제로 지워질 연결을 미리 찾아 둠
+    if action in ('pre_remove', 'pre_clear'):
+        links = Post.tags.through.objects.filter(**{'tag' if reverse else 'post': instance})
+        if action == 'pre_remove':
+            links = links.filter(**{'post__in' if reverse else 'tag__in': pk_set})
+        instance._removed_tag_links = list(links.values_list('post_id' if reverse else 'tag_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.get('_removed_tag_links', [])
+        if reverse:  # tag.post_set.remove(...)
+            _add_post_count(Tag, [instance.pk], -len(removed))
+        else:
+            _add_post_count(Tag, removed, -1)
+    elif action == 'post_add' and pk_set:  # pk_set 에는 이미 연결된 pk 가 빠진 채로 들어옴
+        if reverse:
+            _add_post_count(Tag, [instance.pk], len(pk_set))
+        else:
+            _add_post_count(Tag, pk_set, 1)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    bump_version('posts', 'tags')
+    # 바뀐 연결: add 는 pk_set, remove/clear 는 post_tags_counted 가 pre_* 에서 찾아 둔 목록
+    changed = sorted(pk_set or ()) if action == 'post_add' else instance.__dict__.pop('_removed_tag_links', [])
+    if not reverse:  # post.tags.add(...)
+        enqueue('index_post', instance.pk)
+        if changed:
+            enqueue('update_related_posts', [instance.pk], changed)
+    elif changed:  # tag.post_set.add(...)
+        for pk in changed:
+            enqueue('index_post', pk)
+        enqueue('update_related_posts', changed, [instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_version('posts', 'tags')
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:  # 태그 이름이 바뀌면 그 태그가 달린 포스트를 다시 색인
+        for pk in instance.post_set.values_list('pk', flat=True):
+            enqueue('index_post', pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    clear_sidebar_cache()
+    bump_version('posts', 'sidebar')
+
+
+@receiver(post_save, sender=SocialAccount)
+@receiver(post_delete, sender=SocialAccount)
+def social_account_changed(sender, instance, **kwargs):
+    clear_avatar_cache(instance.user_id)
+    bump_version('avatars')
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
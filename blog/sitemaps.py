@@ -0,0 +1,146 @@
+"""
+sitemap.xml: 포스트, 카테고리, 태그 주소를 담은 사이트맵 인덱스와 조각(shard) 파일
+
+    /sitemap.xml                  사이트맵 인덱스, 조각마다 <lastmod> 는 그 조각 포스트의 updated_at 중 가장 늦은 값
+    /sitemap-posts-0.xml          pk 1 ~ 50000 인 포스트, 조각은 pk 범위로 나누므로 한 파일에 URL 이 SHARD_SIZE 개를 넘지 않음
+    /sitemap-categories-0.xml
+    /sitemap-tags-0.xml
+
+ - 조각은 .iterator() 로 필요한 열만 읽으면서 바로 응답으로 흘려보내므로 모든 행을 메모리에 올리지 않음
+ - 만든 조각은 캐시에 두고, 포스트가 바뀌면 signals 에서 그 포스트가 속한 조각의 버전만 올려서 그 조각만 다시 만듦
+"""
+from datetime import timezone
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .caching import get_version, bump_version, _make_etag
+from .models import Post, Category, Tag
+
+SHARD_SIZE = 50000  # 사이트맵 한 파일에 넣을 수 있는 최대 URL 수
+SITEMAP_CACHE_KEY = 'blog:sitemap:{}'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# 조각 종류: 모델, 읽을 열, 조각이 바뀌었는지 나타내는 버전 이름
+SECTIONS = {
+    'posts': (Post, ('pk', 'updated_at'), lambda shard: f'sitemap-posts-{shard}'),
+    'categories': (Category, ('pk', 'slug'), lambda shard: 'sidebar'),
+    'tags': (Tag, ('pk', 'slug'), lambda shard: 'tags'),
+}
+
+
+def shard_of(pk):
+    return (pk - 1) // SHARD_SIZE
+
+
+def bump_post_shard(pk):
+    bump_version(f'sitemap-posts-{shard_of(pk)}')
+
+
+def bump_post_shards(pks):  # signal 없이 한꺼번에 바뀐 포스트들(bulk_create 등)이 든 조각의 버전을 올림
+    if pks:
+        bump_version(*{f'sitemap-posts-{shard_of(pk)}' for pk in pks})
+
+
+def _shard_expression():
+    return ExpressionWrapper((F('pk') - 1) / SHARD_SIZE, output_field=IntegerField())
+
+
+def _timestamp(value):
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def get_shards():
+    """
+    [(section, shard, lastmod), ...], 종류마다 GROUP BY 쿼리 한 번으로 조각 목록을 만듦
+    포스트, 카테고리, 태그가 바뀔 때 올라가는 버전으로 캐시함
+    """
+    key = SITEMAP_CACHE_KEY.format(_make_etag('index', get_version('posts'), get_version('sidebar'), get_version('tags')))
+    shards = cache.get(key)
+    if shards is None:
+        post_shards = list(
+            Post.objects.order_by().annotate(shard=_shard_expression())
+            .values_list('shard').annotate(Max('updated_at')).order_by('shard')
+        )
+        # 카테고리, 태그 페이지는 포스트가 바뀌면 함께 바뀌므로 가장 최근에 바뀐 포스트의 시각을 씀
+        latest = max((lastmod for _, lastmod in post_shards), default=None)
+        shards = [('posts', shard, lastmod) for shard, lastmod in post_shards]
+        for section in ('categories', 'tags'):
+            model = SECTIONS[section][0]
+            shards += [
+                (section, shard, latest) for shard, _ in
+                model.objects.order_by().annotate(shard=_shard_expression())
+                .values_list('shard').annotate(Count('pk')).order_by('shard')
+            ]
+        cache.set(key, shards, getattr(settings, 'BLOG_SITEMAP_CACHE', 60 * 60 * 24))
+    return shards
+
+
+def _stream(chunks, key, timeout):
+    # 응답으로 흘려보내면서 모아 두었다가 끝까지 보냈으면 캐시에 넣음
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts).encode(), timeout)
+
+
+def _sitemap_response(request, key, chunks, last_modified=None):
+    # 캐시 키의 해시를 ETag 로 씀, 내용이 바뀌면 버전이 바뀌어 키도 바뀜
+    etag = quote_etag(key.rsplit(':', 1)[-1])
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content = cache.get(key)
+        if content is not None:
+            response = HttpResponse(content, content_type='application/xml')
+        else:
+            response = StreamingHttpResponse(
+                _stream(chunks(), key, getattr(settings, 'BLOG_SITEMAP_CACHE', 60 * 60 * 24)),
+                content_type='application/xml',
+            )
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def sitemap_index(request):
+    shards = get_shards()
+    base = request.build_absolute_uri('/')
+
+    def chunks():
+        yield f'{XML_HEADER}<sitemapindex xmlns="{XMLNS}">\n'
+        for section, shard, lastmod in shards:
+            yield f'<sitemap><loc>{escape(base)}sitemap-{section}-{shard}.xml</loc>'
+            yield f'<lastmod>{_timestamp(lastmod)}</lastmod></sitemap>\n' if lastmod else '</sitemap>\n'
+        yield '</sitemapindex>\n'
+
+    key = SITEMAP_CACHE_KEY.format(_make_etag('index', shards, base))
+    last_modified = max((lastmod for _, _, lastmod in shards if lastmod), default=None)
+    return _sitemap_response(request, key, chunks, last_modified)
+
+
+def sitemap_shard(request, section, shard):
+    lastmod = next((lastmod for s, n, lastmod in get_shards() if (s, n) == (section, shard)), False)
+    if lastmod is False:
+        raise Http404
+    model, fields, version_name = SECTIONS[section]
+    base = request.build_absolute_uri('/')[:-1]
+    queryset = model.objects.filter(pk__gt=shard * SHARD_SIZE, pk__lte=(shard + 1) * SHARD_SIZE)
+
+    def chunks():
+        yield f'{XML_HEADER}<urlset xmlns="{XMLNS}">\n'
+        for obj in queryset.only(*fields).order_by('pk').iterator(chunk_size=2000):
+            updated = f'<lastmod>{_timestamp(obj.updated_at)}</lastmod>' if section == 'posts' else ''
+            yield f'<url><loc>{escape(base + obj.get_absolute_url())}</loc>{updated}</url>\n'
+        yield '</urlset>\n'
+
+    key = SITEMAP_CACHE_KEY.format(_make_etag(section, shard, get_version(version_name(shard)), base))
+    return _sitemap_response(request, key, chunks, lastmod)
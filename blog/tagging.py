@@ -0,0 +1,117 @@
+import math
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+from .models import Post, Tag
+from .caching import get_version
+
+TAG_CLOUD_CACHE_KEY = 'blog:tag_cloud:{}'
+TAG_CLOUD_WEIGHTS = 5  # 태그 구름의 글자 크기 단계
+
+
+def parse_tags_str(tags_str):
+    # "new tag; 한글 태그, js" => ['new tag', '한글 태그', 'js'], 빈 태그와 중복은 제외
+    if not tags_str:
+        return []
+    names = []
+    for name in tags_str.replace(',', ';').split(';'):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def unique_slugs(model, names, default='tag'):
+    """
+    {이름: slug}, 새로 만들 객체의 slug 를 쿼리 한 번으로 정함
+    다른 이름인데 slug 가 같아지는 경우("Go", "go")에는 DB 와 names 안에서 겹치지 않도록 뒤에 숫자를 붙임
+    """
+    bases = {name: slugify(name, allow_unicode=True) or default for name in names}
+    # 'go' 를 만들 때 이미 있는 'go-2' 도 피해야 하므로 숫자가 붙은 slug 까지 읽음
+    lookup = reduce(lambda a, b: a | b, (Q(slug=base) | Q(slug__startswith=f'{base}-') for base in set(bases.values())))
+    used = set(model.objects.filter(lookup).values_list('slug', flat=True))
+    slugs = {}
+    for name in names:
+        slug = base = bases[name]
+        i = 2
+        while slug in used:
+            slug = f'{base}-{i}'
+            i += 1
+        used.add(slug)
+        slugs[name] = slug
+    return slugs
+
+
+def get_or_create_tags(names, attempts=3):
+    """
+    태그 이름 목록을 한 번에 조회하고, 없는 태그는 slug 를 붙여 bulk_create 로 한 번에 만듦
+    다른 요청이 같은 태그를 동시에 만들면 그 행은 건너뛰고(ignore_conflicts) 이름으로 다시 읽음,
+    같은 slug 를 먼저 가져가서 만들지 못한 태그는 slug 를 다시 정해서 만듦
+    """
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    for _ in range(attempts):
+        missing = [name for name in names if name not in tags]
+        if not missing:
+            break
+        slugs = unique_slugs(Tag, missing)
+        Tag.objects.bulk_create([Tag(name=name, slug=slugs[name]) for name in missing], ignore_conflicts=True)
+        tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=missing)})
+    return [tags[name] for name in names]
+
+
+def sync_post_tags(post, names):
+    """포스트의 태그를 names 와 같게 맞춤, 태그 수와 상관없이 일정한 수의 쿼리로 바뀐 부분만 반영"""
+    with transaction.atomic():
+        wanted = {tag.pk for tag in get_or_create_tags(names)} if names else set()
+        current = set(post.tags.values_list('pk', flat=True))
+        if current - wanted:
+            post.tags.remove(*(current - wanted))
+        if wanted - current:
+            post.tags.add(*(wanted - current))
+
+
+def get_tag_counts():
+    """
+    [(slug, name, 포스트 수), ...] 를 포스트 수가 많은 순서로 돌려줌
+    태그 연결(through) 테이블의 GROUP BY 쿼리 한 번으로 세고, 'tags' 버전이 바뀌기 전까지 캐시를 씀
+    버전이 바뀌면 새 키를 쓰고, 옛 키는 settings.BLOG_TAG_CLOUD_TIMEOUT 이 지나면 캐시에서 사라짐
+    """
+    key = TAG_CLOUD_CACHE_KEY.format(get_version('tags'))
+    counts = cache.get(key)
+    if counts is None:
+        counts = list(
+            Post.tags.through.objects.order_by().values_list('tag__slug', 'tag__name').annotate(n=Count('pk'))
+        )
+        counts.sort(key=lambda row: (-row[2], row[1]))
+        cache.set(key, counts, getattr(settings, 'BLOG_TAG_CLOUD_TIMEOUT', 600))
+    return counts
+
+
+def _tag_dict(slug, name, count, weight=None):
+    tag = {'name': name, 'slug': slug, 'url': Tag(slug=slug).get_absolute_url(), 'count': count}
+    if weight is not None:
+        tag['weight'] = weight
+    return tag
+
+
+def get_popular_tags(limit=None):
+    limit = limit or getattr(settings, 'BLOG_POPULAR_TAGS', 10)
+    return [_tag_dict(*row) for row in get_tag_counts()[:limit]]
+
+
+def get_tag_cloud():
+    """이름 순서의 모든 태그, weight(1 ~ TAG_CLOUD_WEIGHTS)는 포스트 수의 로그에 비례"""
+    counts = get_tag_counts()
+    if not counts:
+        return []
+    low, high = math.log(counts[-1][2]), math.log(counts[0][2])
+    spread = (high - low) or 1
+    return [
+        _tag_dict(slug, name, count, 1 + round((math.log(count) - low) / spread * (TAG_CLOUD_WEIGHTS - 1)))
+        for slug, name, count in sorted(counts, key=lambda row: row[1])
+    ]
@@ -0,0 +1,167 @@
+"""
+포스트 저장 뒤에 해야 하는 느린 작업(이미지 만들기, 검색 색인 등)을 요청 밖에서 실행하기 위한 작업 큐
+
+별도의 브로커 없이 Job 테이블을 큐로 쓰고, `python manage.py run_tasks` 가 워커가 됨
+settings.BLOG_TASKS_EAGER 가 True 이면 큐에 넣지 않고 바로 실행함 (테스트용)
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Max
+from django.utils import timezone
+
+from .models import Job, Post
+from .caching import bump_version
+from .search import get_search_backend
+from .images import generate_variants, delete_variants
+from . import related
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func):  # @task 로 등록한 함수만 큐에 넣을 수 있음, 인자는 JSON 으로 저장할 수 있어야 함
+    registry[func.__name__] = func
+    return func
+
+
+def enqueue(name, *args, max_attempts=3):
+    if getattr(settings, 'BLOG_TASKS_EAGER', False):
+        # 포스트는 이미 저장되었으므로 작업이 실패해도 요청은 실패시키지 않고 워커처럼 기록만 함
+        try:
+            registry[name](*args)
+        except Exception:
+            logger.exception('task %s%s failed (eager)', name, args)
+        return None
+
+    key = f'{name}:{json.dumps(args)}'[:255]
+    if Job.objects.filter(key=key, status=Job.QUEUED).exists():  # 아직 실행되지 않은 같은 작업이 있으면 합침
+        return None
+    return Job.objects.create(name=name, args=list(args), key=key, max_attempts=max_attempts)
+
+
+def claim_next_job():
+    """
+    실행할 작업 하나를 가져옴, 여러 워커 프로세스가 동시에 돌아도
+    status 를 조건으로 거는 UPDATE 가 성공한 워커 하나만 그 작업을 실행함
+    """
+    while True:
+        job = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).order_by('run_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, attempts=job.attempts + 1
+        )
+        if claimed:
+            job.status, job.started_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+            return job
+
+
+def run_job(job):
+    started = time.perf_counter()
+    try:
+        registry[job.name](*job.args)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:  # 실패하면 2, 4, 8... 초 뒤에 다시 시도
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        else:
+            job.status = Job.FAILED
+        logger.exception('task %s%s failed (attempt %s)', job.name, tuple(job.args), job.attempts)
+    else:
+        job.status = Job.DONE
+    job.duration_ms = (time.perf_counter() - started) * 1000
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_at', 'duration_ms', 'finished_at', 'last_error'])
+    return job
+
+
+def run_pending(limit=None):  # 대기 중인 작업을 limit 개까지 실행하고 실행한 개수를 돌려줌
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def requeue_stale(timeout=timedelta(minutes=10)):
+    """
+    워커가 죽어서 running 으로 남은 작업을 다시 대기열로 돌리고 돌린 개수를 돌려줌
+    이미 max_attempts 번 시도한 작업은 워커를 죽이는 작업일 수 있으므로 다시 넣지 않고 실패로 둠
+    """
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - timeout)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), last_error='worker stopped while running this job'
+    )
+    return stale.filter(attempts__lt=F('max_attempts')).update(status=Job.QUEUED)
+
+
+def task_stats():
+    """작업 이름별 상태 개수와 실행 시간(ms)"""
+    stats = {}
+    for row in Job.objects.order_by().values('name', 'status').annotate(
+        count=Count('pk'), avg_ms=Avg('duration_ms'), max_ms=Max('duration_ms')
+    ):
+        stat = stats.setdefault(row['name'], {'avg_ms': None, 'max_ms': None})
+        stat[row['status']] = row['count']
+        if row['status'] == Job.DONE:
+            stat['avg_ms'], stat['max_ms'] = row['avg_ms'], row['max_ms']
+    return stats
+
+
+# 포스트 저장 뒤에 하는 작업들
+# signals 에서 올린 버전은 작업이 끝나기 전의 페이지에 붙으므로, 페이지에 보이는 것을 바꾼 작업은 끝난 뒤에 다시 올림
+@task
+def index_post(pk):
+    post = Post.objects.filter(pk=pk).prefetch_related('tags').first()
+    if post is None:
+        get_search_backend().remove_post(pk)
+    else:
+        get_search_backend().index_post(post)
+    bump_version('posts')  # 검색 결과 페이지
+
+
+@task
+def remove_post_index(pk):
+    get_search_backend().remove_post(pk)
+    bump_version('posts')
+
+
+@task
+def update_head_image_variants(pk):
+    post = Post.objects.filter(pk=pk).only('pk', 'head_image', 'head_image_variants').first()
+    if post is None:
+        return
+    name = post.head_image.name or ''
+    if post.head_image_variants.get('source', '') == name:  # 이미 지금 이미지로 만들어 둔 경우
+        return
+    delete_variants(post.head_image_variants)
+    variants = generate_variants(name) if name else {}
+    # update() 는 updated_at 을 바꾸지 않으므로 srcset 이 보이는 리스트, 상세 페이지는 버전으로 바꿈
+    Post.objects.filter(pk=pk).update(head_image_variants=variants)
+    bump_version('posts')
+
+
+@task
+def delete_head_image_variants(variants):
+    delete_variants(variants)
+
+
+@task
+def update_related_posts(post_ids, tag_ids):
+    related.update_related_posts(post_ids, tag_ids)  # 저장한 뒤에 'related' 버전을 올림 (상세 페이지)
+
+
+@task
+def build_related_posts():
+    related.build_related_posts()
@@ -0,0 +1,54 @@
+from django import template
+
+from ..caching import get_version
+from ..fragments import fragment_key, get_or_render
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, versions):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.versions = versions
+
+    def get_version(self, context, name):  # 한 번 그리는 동안 같은 버전을 여러 번 캐시에서 읽지 않도록
+        versions = context.render_context.setdefault('fragment_cache_versions', {})
+        if name not in versions:
+            versions[name] = get_version(name)
+        return versions[name]
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        key = fragment_key(
+            name,
+            [value.resolve(context) for value in self.vary_on],
+            [version.resolve(context) for version in self.versions],
+            lambda version: self.get_version(context, version),
+        )
+        return get_or_render(name, key, lambda: self.nodelist.render(context))
+
+
+@register.tag('cache_fragment')
+def do_cache_fragment(parser, token):
+    """
+    {% cache_fragment name [값 ...] [versions 버전 이름 ...] %} ... {% endcache_fragment %}
+    값과 버전이 같으면 안쪽을 다시 그리지 않고 캐시에 넣어 둔 문자열을 씀
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least a fragment name.")
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    args = bits[2:]
+    versions = []
+    if 'versions' in args:
+        index = args.index('versions')
+        args, versions = args[:index], args[index + 1:]
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(arg) for arg in args],
+        [parser.compile_filter(version) for version in versions],
+    )
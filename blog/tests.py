@@ -1,11 +1,44 @@
-from django.test import TestCase, Client
+import base64
+import json
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+from datetime import timedelta
+from xml.etree import ElementTree
+from PIL import Image
+from io import StringIO, BytesIO
+from django.test import TestCase, Client, AsyncRequestFactory, override_settings
+from django.contrib.auth.models import AnonymousUser
+from asgiref.sync import async_to_sync
+from django.core.management import call_command, CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.core.cache import cache
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 from bs4 import BeautifulSoup
 from django.contrib.auth.models import User
-from .models import Post, Category, Tag, Comment
-
-
+from allauth.socialaccount.models import SocialAccount
+from .models import Post, Category, Tag, Comment, MARKDOWN_RENDER_VERSION
+from .tagging import parse_tags_str, sync_post_tags, get_or_create_tags, unique_slugs
+from .tasks import task, registry, run_pending, task_stats, enqueue, requeue_stale
+from .models import Job, RelatedPost
+from . import profiling, async_views, related, view_counts, fragments
+from .caching import bump_version, get_version
+from .db import ReadReplicaRouter, read_only, get_sqlite_pragmas, mark_written, LAST_WRITE_SESSION_KEY
+from .management.commands import build_static_site
+from django.template import Template, Context
+
+
+# 워커 없이 포스트 저장 뒤의 작업을 바로 실행, 캐시는 테스트 프로세스 안에서만 씀
+@override_settings(BLOG_TASKS_EAGER=True, CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
 class TestView(TestCase):
     def setUp(self):
+        cache.clear()  # 테스트마다 캐시를 비움
+        view_counts.reset()  # 다른 테스트에서 모인 조회수가 이 테스트의 DB 에 더해지지 않도록
+        self.addCleanup(view_counts.reset)
+
         # 임의의 사용자 만들기
         self.client = Client()
         self.user_user1 = User.objects.create_user(username='user1', password='somepassword')
@@ -89,6 +122,16 @@ class TestView(TestCase):
         # 미분류인 포스트도 잘 표시되는지 확인
         self.assertIn(f'미분류 (1)', categories_card.text)
 
+    # 쿼리 수 테스트 코드, 페이지에 보이는 포스트 수와 상관없이 budget 이하의 쿼리만 실행되어야 함
+    def query_budget_test(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url} : {len(queries)} queries\n' + '\n'.join(q['sql'] for q in queries.captured_queries)
+        )
+
     # 포스트 리스트 페이지 테스트 코드
     def test_post_list(self):
         # 포스트가 있는 경우
@@ -491,4 +534,963 @@ class TestView(TestCase):
         self.assertNotIn(self.post_002.title, main_area.text)
         self.assertNotIn(self.post_003.title, main_area.text)
         self.assertIn(self.post_001.title, main_area.text)
-        self.assertIn(post_about_rust.title, main_area.text)
\ No newline at end of file
+        self.assertIn(post_about_rust.title, main_area.text)
+
+    def test_content_markdown_cache(self):
+        # 저장할 때 마크다운이 미리 렌더링 되어 있어야 함
+        self.assertIn('Hello World!', self.post_001.content_html)
+        self.assertEqual(self.post_001.content_html_version, MARKDOWN_RENDER_VERSION)
+
+        # 렌더러 버전이 다른 포스트는 render_markdown 명령으로 다시 렌더링
+        Post.objects.filter(pk=self.post_001.pk).update(content_html='', excerpt_html='', content_html_version=0)
+        updated_at = Post.objects.get(pk=self.post_001.pk).updated_at
+        detail_etag = self.client.get(self.post_001.get_absolute_url())['ETag']
+        list_etag = self.client.get('/blog/')['ETag']
+        call_command('render_markdown', stdout=StringIO())
+        # 수정일자가 그대로여도 페이지는 다시 렌더링한 HTML 로 바뀌어야 함
+        response = self.client.get(self.post_001.get_absolute_url(), HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+        post_001 = Post.objects.get(pk=self.post_001.pk)
+        self.assertTrue(post_001.is_content_rendered())
+        self.assertIn('Hello World!', post_001.excerpt_html)
+        self.assertEqual(post_001.updated_at, updated_at)  # 수정일자는 바뀌지 않아야 함
+
+    def test_listing_query_budget(self):
+        # 태그가 여러 개 달린 포스트를 많이 만들어도 쿼리 수는 그대로여야 함
+        for i in range(20):
+            post = Post.objects.create(
+                title=f'포스트 {i}',
+                content='쿼리 수 테스트',
+                category=self.category_python,
+                author=self.user_user1
+            )
+            post.tags.add(self.tag_go, self.tag_js, self.tag_rust_kor)
+
+        # 첫 요청은 사이드바(카테고리, 많이 읽은 글, 인기 태그)의 캐시를 채우는 쿼리를 포함
+        self.query_budget_test('/blog/', 6)
+        self.query_budget_test(self.category_python.get_absolute_url(), 5)
+        self.query_budget_test('/blog/category/no_category/', 4)
+        self.query_budget_test(self.tag_go.get_absolute_url(), 5)
+
+    def test_shared_cache_versions(self):
+        # 설정의 캐시는 다른 프로세스(다른 웹 워커, run_tasks)가 올린 버전도 보여야 함
+        from Blogstudy import settings as project_settings
+        with tempfile.TemporaryDirectory() as location:
+            config = {**project_settings.CACHES['default'], 'LOCATION': location}
+            with self.settings(CACHES={'default': config}):
+                before = get_version('posts')
+                worker = multiprocessing.get_context('fork').Process(target=bump_version, args=('posts',))
+                worker.start()
+                worker.join()
+                self.assertGreater(get_version('posts'), before)
+
+    def test_sidebar_cache(self):
+        self.client.get('/blog/')  # 사이드바 캐시를 채움
+
+        # 캐시가 채워진 뒤에는 사이드바를 위한 쿼리가 없어야 함
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.post_001.get_absolute_url())
+        sidebar_queries = [
+            q for q in queries.captured_queries
+            if '"blog_post"."category_id" IS NULL' in q['sql'] or q['sql'].endswith('FROM "blog_category"')
+        ]
+        self.assertFalse(sidebar_queries)
+
+        # 카테고리가 바뀌면 캐시가 지워지고 새 숫자가 보여야 함
+        self.post_003.category = self.category_python
+        self.post_003.save()
+        response = self.client.get('/blog/')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        categories_card = soup.find('div', id='categories-card')
+        self.assertIn(f'{self.category_python.name} (2)', categories_card.text)
+        self.assertIn('미분류 (0)', categories_card.text)
+
+    def test_search_index(self):
+        # 본문(content)과 hook_text 도 검색되어야 함
+        response = self.client.get('/blog/search/Hello/')
+        main_area = BeautifulSoup(response.content, 'html.parser').find('div', id='main-area')
+        self.assertIn('Search: Hello(1)', main_area.text)
+        self.assertIn(self.post_001.title, main_area.text)
+
+        # 포스트를 수정하거나 삭제하면 색인도 바로 바뀌어야 함
+        self.post_002.content = 'Hello again.'
+        self.post_002.save()
+        self.post_001.delete()
+        response = self.client.get('/blog/search/Hello/')
+        main_area = BeautifulSoup(response.content, 'html.parser').find('div', id='main-area')
+        self.assertIn('Search: Hello(1)', main_area.text)
+        self.assertIn(self.post_002.title, main_area.text)
+
+        # 태그를 바꾸면 태그 이름으로 검색되어야 함
+        self.post_002.tags.add(self.tag_go)
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get('/blog/search/go/')
+        main_area = BeautifulSoup(response.content, 'html.parser').find('div', id='main-area')
+        self.assertIn('Search: go(2)', main_area.text)
+
+        # 색인 테이블은 migrate 뒤에 만들어 두므로 검색할 때마다 DDL 을 실행하지 않음
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/blog/search/go/')
+        self.assertFalse([q for q in queries.captured_queries if 'CREATE' in q['sql']])
+
+    def test_cursor_pagination(self):
+        for i in range(9):
+            Post.objects.create(title=f'페이지 {i}', content='페이지네이션', author=self.user_user1)
+
+        # Older 링크를 따라가면 12개의 포스트가 5, 5, 2 개씩 최신순으로 한 번씩만 나와야 함
+        pages = []
+        url = '/blog/'
+        while url:
+            soup = BeautifulSoup(self.client.get(url).content, 'html.parser')
+            pages.append([div.attrs['id'] for div in soup.find_all('div', class_='card mb-4')])
+            older = soup.find('a', text='Older')
+            url = '/blog/' + older.attrs['href'] if older.attrs['href'] != '#' else None
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        expected = [f'post-{p.pk}' for p in Post.objects.order_by('-created_at', '-pk')]
+        self.assertEqual(sum(pages, []), expected)
+
+        # 마지막 페이지에서 Newer 링크를 누르면 두 번째 페이지로 돌아가야 함
+        newer = soup.find('a', text='Newer')
+        soup = BeautifulSoup(self.client.get('/blog/' + newer.attrs['href']).content, 'html.parser')
+        self.assertEqual([div.attrs['id'] for div in soup.find_all('div', class_='card mb-4')], pages[1])
+
+        # 카테고리 페이지와 검색 결과도 같은 방식으로 페이지가 나뉘어야 함
+        soup = BeautifulSoup(self.client.get('/blog/category/no_category/').content, 'html.parser')
+        self.assertEqual(len(soup.find_all('div', class_='card mb-4')), 5)
+        self.assertNotEqual(soup.find('a', text='Older').attrs['href'], '#')
+        soup = BeautifulSoup(self.client.get('/blog/search/페이지/').content, 'html.parser')
+        self.assertIn('Search: 페이지(9)', soup.find('div', id='main-area').text)
+        older = soup.find('a', text='Older')
+        soup = BeautifulSoup(self.client.get('/blog/search/페이지/' + older.attrs['href']).content, 'html.parser')
+        self.assertEqual(len(soup.find_all('div', class_='card mb-4')), 4)
+
+        # 잘못된 커서는 404, 형식은 맞지만 값의 개수나 타입을 바꾼 커서도 마찬가지
+        self.assertEqual(self.client.get('/blog/?after=abc').status_code, 404)
+        for values in (['abc', 'xyz'], ['2022-01-01T00:00:00+00:00', 'abc'], [1], [[1], 2], [None, 1], [True, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            self.assertEqual(self.client.get(f'/blog/?after={cursor}').status_code, 404)
+            self.assertEqual(self.client.get(f'/blog/?before={cursor}').status_code, 404)
+        cursor = base64.urlsafe_b64encode(json.dumps(['abc', 1]).encode()).decode()
+        self.assertEqual(self.client.get(f'/blog/search/페이지/?after={cursor}').status_code, 404)
+
+        # 단어가 없는 검색어는 결과 없이 보여줌
+        response = self.client.get('/blog/search/!!!/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Search: !!!(0)', BeautifulSoup(response.content, 'html.parser').find('div', id='main-area').text)
+
+    def test_conditional_get(self):
+        # 내용이 바뀌지 않았다면 304
+        response = self.client.get(self.post_001.get_absolute_url())
+        etag = response['ETag']
+        response = self.client.get(self.post_001.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # 댓글이 지워지면 다시 200
+        self.comment_001.delete()
+        response = self.client.get(self.post_001.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # 리스트 페이지는 포스트가 수정되면 다시 200
+        etag = self.client.get('/blog/')['ETag']
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.post_002.title = '두 번째 포스트 수정'
+        self.post_002.save()
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(BLOG_ANONYMOUS_PAGE_CACHE=60)
+    def test_anonymous_page_cache(self):
+        self.client.get('/blog/')
+        with self.assertNumQueries(0):  # 캐시된 페이지는 DB 와 템플릿을 거치지 않음
+            response = self.client.get('/blog/')
+        self.assertIn(self.post_001.title, response.content.decode())
+
+        # 태그가 바뀌면 캐시된 페이지를 쓰지 않음
+        self.tag_go.name = 'golang'
+        self.tag_go.save()
+        self.assertIn('golang', self.client.get('/blog/').content.decode())
+
+    def test_sync_post_tags(self):
+        self.assertEqual(parse_tags_str(' a; b, a;; c; '), ['a', 'b', 'c'])
+
+        # 태그 수가 늘어나도 쿼리 수는 같아야 함
+        post_few = Post.objects.create(title='태그 3개', content='태그', author=self.user_user1)
+        post_many = Post.objects.create(title='태그 30개', content='태그', author=self.user_user1)
+        with CaptureQueriesContext(connection) as few:
+            sync_post_tags(post_few, [f'few {i}' for i in range(3)] + ['go'])
+        with CaptureQueriesContext(connection) as many:
+            sync_post_tags(post_many, [f'many {i}' for i in range(30)] + ['go'])
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(post_many.tags.count(), 31)
+
+        # 바뀐 태그만 반영되어야 함, 같은 slug 가 되는 태그 이름도 만들 수 있어야 함
+        sync_post_tags(post_many, ['go', 'Go', 'many 0'])
+        self.assertEqual(sorted(post_many.tags.values_list('name', flat=True)), ['Go', 'go', 'many 0'])
+        self.assertEqual(Tag.objects.get(name='Go').slug, 'go-2')
+        # 숫자가 붙은 slug 가 이미 있으면 그 다음 숫자를 씀
+        sync_post_tags(post_few, ['GO', 'go 2'])
+        self.assertEqual(dict(post_few.tags.values_list('name', 'slug')), {'GO': 'go-3', 'go 2': 'go-2-2'})
+
+        # 다른 요청이 같은 태그나 같은 slug 의 태그를 먼저 만들어도 오류 없이 가져와야 함
+        def racing_unique_slugs(model, names, default='tag'):
+            slugs = unique_slugs(model, names, default)
+            if not Tag.objects.filter(name='동시 태그').exists():
+                Tag.objects.create(name='동시 태그', slug=slugs['동시 태그'])
+                Tag.objects.create(name='RACE', slug=slugs['Race'])
+            return slugs
+
+        with mock.patch('blog.tagging.unique_slugs', racing_unique_slugs):
+            tags = get_or_create_tags(['동시 태그', 'Race'])
+        self.assertEqual([(tag.name, tag.slug) for tag in tags], [('동시 태그', '동시-태그'), ('Race', 'race-2')])
+
+    def test_import_export_posts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'posts.jsonl')
+            call_command('export_posts', path, stderr=StringIO())
+            call_command('export_posts', os.path.join(tmp, 'md'), format='markdown', stderr=StringIO())
+
+            created_at = self.post_001.created_at
+            Post.objects.all().delete()
+            call_command('import_posts', path, batch_size=2, stdout=StringIO())
+
+            # 포스트, 태그, 카테고리, 댓글, 작성일자가 그대로 들어와야 함
+            self.assertEqual(Post.objects.count(), 3)
+            post_001 = Post.objects.get(title=self.post_001.title)
+            self.assertEqual(post_001.created_at, created_at)
+            self.assertEqual(post_001.category, self.category_python)
+            self.assertEqual(list(post_001.tags.all()), [self.tag_rust_kor])
+            self.assertEqual(post_001.comment_set.get().content, self.comment_001.content)
+            self.assertIn('Hello World!', post_001.content_html)
+            self.assertEqual(Post.objects.get(title=self.post_003.title).tags.count(), 2)
+
+            # 마크다운 폴더에서도 가져올 수 있어야 함
+            call_command('import_posts', os.path.join(tmp, 'md'), format='markdown', stdout=StringIO())
+            self.assertEqual(Post.objects.count(), 6)
+            self.assertEqual(Post.objects.filter(tags=self.tag_go).count(), 2)
+            self.assertEqual(Tag.objects.count(), 3)
+            self.assertEqual(Comment.objects.filter(content=self.comment_001.content).count(), 2)  # 댓글도 함께
+
+            # slug 가 겹치는 카테고리 이름도 가져올 수 있어야 함
+            path = os.path.join(tmp, 'categories.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                for category in ('Python', 'Web Dev', 'web-dev'):
+                    f.write(json.dumps({'title': category, 'content': '카테고리', 'category': category}) + '\n')
+            call_command('import_posts', path, stdout=StringIO())
+            self.assertEqual(
+                dict(Category.objects.filter(name__in=['Python', 'Web Dev', 'web-dev']).values_list('name', 'slug')),
+                {'Python': 'python-2', 'Web Dev': 'web-dev', 'web-dev': 'web-dev-2'},
+            )
+
+        # 검색 색인과 사이드바도 바뀌어야 함
+        response = self.client.get('/blog/search/Hello/')
+        self.assertIn('Search: Hello(2)', BeautifulSoup(response.content, 'html.parser').find('div', id='main-area').text)
+        self.assertIn(f'{self.category_python.name} (2)', response.content.decode())
+        self.assertIn('Web Dev (1)', response.content.decode())
+
+    def test_comment_avatar_queries(self):
+        SocialAccount.objects.create(
+            user=self.user_user1, provider='google', uid='1', extra_data={'picture': 'https://example.com/user1.png'}
+        )
+        self.client.get(self.post_001.get_absolute_url())  # 아바타 캐시를 채움
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.post_001.get_absolute_url())
+
+        # 댓글과 작성자가 늘어나도 쿼리 수는 같아야 함
+        for i in range(10):
+            user = User.objects.create_user(username=f'commenter{i}', password='somepassword')
+            SocialAccount.objects.create(user=user, provider='google', uid=f'c{i}', extra_data={})
+            Comment.objects.create(post=self.post_001, author=user, content=f'comment {i}')
+        self.client.get(self.post_001.get_absolute_url())
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.post_001.get_absolute_url())
+        self.assertEqual(len(few), len(many))
+
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertEqual(soup.find('div', id='comment-1').img.attrs['src'], 'https://example.com/user1.png')
+
+        # 소셜 계정이 바뀌면 아바타도 바뀌어야 함
+        account = self.user_user1.socialaccount_set.get()
+        account.extra_data = {'picture': 'https://example.com/new.png'}
+        account.save()
+        soup = BeautifulSoup(self.client.get(self.post_001.get_absolute_url()).content, 'html.parser')
+        self.assertEqual(soup.find('div', id='comment-1').img.attrs['src'], 'https://example.com/new.png')
+
+    def test_comment_pagination(self):
+        for i in range(24):
+            Comment.objects.create(post=self.post_001, author=self.user_user2, content=f'comment {i}')
+        self.assertEqual(Post.objects.get(pk=self.post_001.pk).comment_count, 25)
+
+        # 상세 페이지에는 첫 페이지의 댓글만 보이고 다음 페이지 주소가 있어야 함
+        soup = BeautifulSoup(self.client.get(self.post_001.get_absolute_url()).content, 'html.parser')
+        comment_area = soup.find('div', id='comment-area')
+        self.assertIn('Comments (25)', comment_area.text)
+        self.assertEqual(len(comment_area.find_all('div', class_='d-flex')), 20)
+        next_url = comment_area.find('div', id='comment-more').attrs['data-next-url']
+
+        data = self.client.get(next_url).json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual([c['content'] for c in data['comments']], [f'comment {i}' for i in range(19, 24)])
+        self.assertIsNone(data['next'])
+        self.assertIn('comment 23', data['html'])
+
+        response = self.client.get(next_url + '&format=html')
+        self.assertEqual(len(BeautifulSoup(response.content, 'html.parser').find_all('div', class_='d-flex')), 5)
+
+        # 새 댓글을 쓰면 그 댓글이 들어 있는 댓글 페이지로 이동해야 함
+        self.client.login(username='user1', password='somepassword')
+        response = self.client.post(f'{self.post_001.get_absolute_url()}new_comment/', {'content': '새 댓글'})
+        new_comment = Comment.objects.get(content='새 댓글')
+        self.assertIn('?comments_after=', response.url)
+        self.assertTrue(response.url.endswith(f'#comment-{new_comment.pk}'))
+        soup = BeautifulSoup(self.client.get(response.url.split('#')[0]).content, 'html.parser')
+        comment_area = soup.find('div', id='comment-area')
+        self.assertIsNotNone(comment_area.find('div', id=f'comment-{new_comment.pk}'))
+        self.assertEqual(len(comment_area.find_all('div', class_='d-flex')), 6)
+        self.assertEqual(comment_area.find('a', text='Show earlier comments').attrs['href'],
+                         f'{self.post_001.get_absolute_url()}#comment-area')
+        new_comment.delete()
+
+        # 카운터가 틀어져도 reconcile_counters 로 고칠 수 있어야 함
+        Comment.objects.filter(content='comment 0').delete()
+        Post.objects.filter(pk=self.post_001.pk).update(comment_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.post_001.pk).comment_count, 24)
+
+    def test_post_counters(self):
+        def counts():
+            return (
+                dict(Tag.objects.values_list('slug', 'post_count')),
+                dict(Category.objects.values_list('slug', 'post_count')),
+            )
+
+        self.assertEqual(counts(), ({'러스트 공부': 1, 'go': 1, 'js': 1}, {'python': 1, 'javascript': 1}))
+
+        # 이미 연결된 태그를 다시 더하거나 연결되지 않은 태그를 지워도 숫자가 틀어지면 안 됨
+        self.post_001.tags.add(self.tag_go, self.tag_rust_kor)
+        self.post_001.tags.remove(self.tag_js)
+        self.tag_js.post_set.add(self.post_001, self.post_002)
+        self.assertEqual(counts()[0], {'러스트 공부': 1, 'go': 2, 'js': 3})
+        self.tag_js.post_set.remove(self.post_002, self.post_002)
+        self.post_003.tags.clear()
+        self.assertEqual(counts()[0], {'러스트 공부': 1, 'go': 1, 'js': 1})
+
+        # 카테고리를 옮기거나 포스트를 지우면 카테고리와 태그의 숫자가 함께 바뀜
+        self.post_002.category = self.category_python
+        self.post_002.save()
+        self.assertEqual(counts()[1], {'python': 2, 'javascript': 0})
+        self.post_001.delete()
+        self.assertEqual(counts(), ({'러스트 공부': 0, 'go': 0, 'js': 0}, {'python': 1, 'javascript': 0}))
+
+        # 태그 페이지와 사이드바는 카운터를 읽기만 함
+        self.post_002.tags.add(self.tag_go)
+        soup = BeautifulSoup(self.client.get(self.tag_go.get_absolute_url()).content, 'html.parser')
+        self.assertIn('go(1)', soup.find('div', id='main-area').text)
+        self.assertIn('python (1)', soup.find('div', id='categories-card').text)
+
+        # 카운터를 읽기 전에 불러온 객체를 저장해도 카운터를 덮어쓰지 않음
+        stale_tag, stale_category = Tag.objects.get(slug='go'), Category.objects.get(slug='python')
+        self.post_003.tags.add(self.tag_go)
+        self.post_003.category = self.category_python
+        self.post_003.save()
+        stale_tag.name, stale_category.name = 'golang', '파이썬'
+        stale_tag.save()
+        stale_category.save()
+        self.assertEqual(counts(), ({'러스트 공부': 0, 'go': 2, 'js': 0}, {'python': 2, 'javascript': 0}))
+        self.assertEqual(Tag.objects.get(slug='go').name, 'golang')
+        self.post_003.tags.remove(self.tag_go)
+        self.post_003.category = None
+        self.post_003.save()
+
+        # 어긋난 카운터는 reconcile_counters 로 고침
+        Tag.objects.update(post_count=7)
+        Category.objects.filter(slug='javascript').update(post_count=3)
+        Post.tags.through.objects.create(post=self.post_003, tag=self.tag_js)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(counts(), ({'러스트 공부': 0, 'go': 1, 'js': 1}, {'python': 1, 'javascript': 0}))
+
+    def test_tag_cloud(self):
+        self.post_001.tags.add(self.tag_go)
+        self.post_002.tags.add(self.tag_go, self.tag_js)
+
+        # 태그 연결 테이블의 GROUP BY 쿼리 한 번으로 세고, 그 뒤에는 캐시를 씀
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/blog/tags/').json()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('GROUP BY', queries.captured_queries[0]['sql'])
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([(t['name'], t['count'], t['weight']) for t in data['tags']],
+                         [('go', 3, 5), ('js', 2, 4), ('러스트 공부', 1, 1)])
+        self.assertEqual([t['slug'] for t in data['popular']], ['go', 'js', '러스트 공부'])
+        self.assertEqual(self.client.get('/blog/tags/?limit=1').json()['popular'][0]['url'], '/blog/tag/go/')
+        with self.assertNumQueries(0):
+            self.client.get('/blog/tags/?limit=2')
+
+        # 태그 연결이 바뀌면 바로 다시 셈
+        self.post_003.tags.clear()
+        data = self.client.get('/blog/tags/').json()
+        self.assertEqual([(t['slug'], t['count']) for t in data['popular']], [('go', 2), ('js', 1), ('러스트 공부', 1)])
+
+        # HTML 조각과 사이드바의 인기 태그
+        soup = BeautifulSoup(self.client.get('/blog/tags/?format=html').content, 'html.parser')
+        self.assertEqual(soup.find('a', class_='tag-cloud-5').text, 'go')
+        soup = BeautifulSoup(self.client.get(self.post_002.get_absolute_url()).content, 'html.parser')
+        self.assertIn('go (2)', soup.find('div', id='popular-tags-card').text)
+
+    def test_feeds(self):
+        def titles(response, tag='item'):
+            return [item.findtext('title') for item in ElementTree.fromstring(response.content).iter(tag)]
+
+        response = self.client.get('/blog/rss/')
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        self.assertEqual(titles(response), [self.post_003.title, self.post_002.title, self.post_001.title])
+        item = next(ElementTree.fromstring(response.content).iter('item'))
+        self.assertEqual(item.findtext('description'), self.post_003.content_html)
+
+        # 같은 피드를 다시 요청하면 쿼리 없이 304, 조건 없이 요청해도 캐시에서 돌려줌
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/blog/rss/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            self.assertEqual(self.client.get('/blog/rss/').content, response.content)
+
+        # 카테고리별, 태그별 Atom 피드
+        response = self.client.get(f'{self.category_python.get_absolute_url()}atom/')
+        atom = '{http://www.w3.org/2005/Atom}'
+        entries = ElementTree.fromstring(response.content).iter(f'{atom}entry')
+        self.assertEqual([entry.findtext(f'{atom}title') for entry in entries], [self.post_001.title])
+        self.assertEqual(titles(self.client.get(f'{self.tag_go.get_absolute_url()}rss/')), [self.post_003.title])
+        self.assertEqual(self.client.get('/blog/tag/nothing/rss/').status_code, 404)
+
+        # 포스트가 바뀌면 ETag 가 바뀌고 새 피드를 만듦
+        self.post_001.title = '새 제목'
+        self.post_001.save()
+        new = self.client.get('/blog/rss/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(new.status_code, 200)
+        self.assertIn('새 제목', new.content.decode())
+
+    def test_sitemap(self):
+        sitemap = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+        def parse(response):
+            return ElementTree.fromstring(b''.join(response.streaming_content) if response.streaming else response.content)
+
+        def locs(response):
+            return [loc.text for loc in parse(response).iter(f'{sitemap}loc')]
+
+        index = parse(self.client.get('/sitemap.xml'))
+        self.assertEqual([loc.text for loc in index.iter(f'{sitemap}loc')], [
+            'http://testserver/sitemap-posts-0.xml',
+            'http://testserver/sitemap-categories-0.xml',
+            'http://testserver/sitemap-tags-0.xml',
+        ])
+        self.assertEqual(index.findtext(f'{sitemap}sitemap/{sitemap}lastmod'),
+                         self.post_003.updated_at.strftime('%Y-%m-%dT%H:%M:%S+00:00'))
+
+        # 조각은 iterator 로 읽으면서 흘려보내고, 두 번째부터는 캐시에서 쿼리 없이 돌려줌
+        response = self.client.get('/sitemap-posts-0.xml')
+        self.assertTrue(response.streaming)
+        self.assertEqual(locs(response), [f'http://testserver{p.get_absolute_url()}'
+                                          for p in (self.post_001, self.post_002, self.post_003)])
+        with self.assertNumQueries(0):
+            response = self.client.get('/sitemap-posts-0.xml')
+            self.assertFalse(response.streaming)
+            self.assertEqual(self.client.get('/sitemap-posts-0.xml',
+                                             HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(len(locs(self.client.get('/sitemap-tags-0.xml'))), 3)
+        self.assertEqual(self.client.get('/sitemap-posts-1.xml').status_code, 404)
+
+        # 포스트가 바뀌면 그 포스트가 든 조각만 다시 만듦
+        etag = response['ETag']
+        self.post_002.delete()
+        response = self.client.get('/sitemap-posts-0.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(locs(response)), 2)
+
+        # signal 없이 bulk_create 로 가져온 포스트도 조각에 바로 보여야 함
+        etag = self.client.get('/sitemap-posts-0.xml')['ETag']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'posts.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'title': '가져온 포스트', 'content': '사이트맵'}) + '\n')
+            call_command('import_posts', path, stdout=StringIO())
+        imported = Post.objects.get(title='가져온 포스트')
+        response = self.client.get('/sitemap-posts-0.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'http://testserver{imported.get_absolute_url()}', locs(response))
+
+    def test_related_posts(self):
+        def related_titles(post):
+            return [p.title for p in related.get_related_posts(post)]
+
+        def snapshot():
+            return list(RelatedPost.objects.order_by('post', 'rank').values_list('post', 'related', 'score'))
+
+        # 태그가 바뀐 포스트와 같은 태그를 가진 포스트만 다시 계산됨
+        self.post_002.tags.add(self.tag_go)
+        self.assertEqual(related_titles(self.post_003), [self.post_002.title])
+        self.post_001.tags.add(self.tag_go, self.tag_js)
+        self.assertEqual(related_titles(self.post_003), [self.post_001.title, self.post_002.title])
+        self.assertEqual(related_titles(self.post_002), [self.post_003.title, self.post_001.title])
+        self.assertAlmostEqual(RelatedPost.objects.get(post=self.post_003, rank=0).score, 2 / 6 ** 0.5)
+
+        # 부분 계산 결과는 전체를 다시 계산한 결과와 같아야 하고, NumPy/SciPy 가 없어도 같은 결과
+        incremental = snapshot()
+        call_command('build_related_posts', stdout=StringIO())
+        self.assertEqual(snapshot(), incremental)
+        sparse = related.sparse
+        related.sparse = None
+        try:
+            related.build_related_posts()
+        finally:
+            related.sparse = sparse
+        self.assertEqual(snapshot(), incremental)
+
+        # 상세 페이지는 쿼리 한 번으로 읽음
+        with self.assertNumQueries(1):
+            related_titles(self.post_003)
+        soup = BeautifulSoup(self.client.get(self.post_003.get_absolute_url()).content, 'html.parser')
+        self.assertEqual([a.text for a in soup.find('div', id='related-posts').find_all('a')],
+                         [self.post_001.title, self.post_002.title])
+
+        # 태그를 지우거나 포스트를 지우면 관련 포스트에서 빠짐
+        self.tag_go.post_set.remove(self.post_002)
+        self.assertEqual(related_titles(self.post_002), [])
+        self.assertEqual(related_titles(self.post_003), [self.post_001.title])
+        self.post_001.delete()
+        self.assertEqual(related_titles(self.post_003), [])
+
+    def test_view_counts(self):
+        # 조회는 모아 두었다가 flush 할 때 UPDATE 한 번으로 더함
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.client.get(self.post_001.get_absolute_url())
+            response = self.client.get(self.post_002.get_absolute_url())
+            self.client.get(self.post_002.get_absolute_url(), HTTP_IF_NONE_MATCH=response['ETag'])  # 304 도 셈
+            self.client.post(self.post_002.get_absolute_url())
+        self.assertFalse([q for q in queries.captured_queries if 'view_count' in q['sql'] and 'UPDATE' in q['sql']])
+        with self.assertNumQueries(3):  # SAVEPOINT, UPDATE, RELEASE
+            self.assertEqual(view_counts.flush(), 5)
+        self.assertEqual(dict(Post.objects.values_list('pk', 'view_count')),
+                         {self.post_001.pk: 3, self.post_002.pk: 2, self.post_003.pk: 0})
+
+        # 불러온 뒤에 더해진 조회수를 저장하면서 덮어쓰지 않음
+        post = Post.objects.get(pk=self.post_001.pk)
+        view_counts.record_view(post.pk)
+        view_counts.flush()
+        post.title = '제목 수정'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 4)
+
+        # 모인 조회가 FLUSH_SIZE 를 넘으면 바로 더함
+        with self.settings(BLOG_VIEW_COUNT_FLUSH_SIZE=2):
+            view_counts.record_view(self.post_003.pk)
+            self.assertEqual(Post.objects.get(pk=self.post_003.pk).view_count, 0)
+            view_counts.record_view(self.post_003.pk)
+            self.assertEqual(Post.objects.get(pk=self.post_003.pk).view_count, 2)
+
+        # 많이 읽은 글은 캐시된 순위에서 읽고, 상세 페이지에는 조회수가 보임
+        self.assertEqual([p['pk'] for p in view_counts.get_most_read()],
+                         [self.post_001.pk, self.post_003.pk, self.post_002.pk])
+        with self.assertNumQueries(0):
+            view_counts.get_most_read()
+        soup = BeautifulSoup(self.client.get(self.post_001.get_absolute_url()).content, 'html.parser')
+        self.assertIn('조회 4', soup.find('div', id='post-area').text)
+        self.assertIn('제목 수정 (4)', soup.find('div', id='most-read-card').text)
+
+        # 조회수를 더하면 상세 페이지의 ETag 와 익명 사용자용 페이지 캐시도 바뀜
+        view_counts.reset()
+        with self.settings(BLOG_ANONYMOUS_PAGE_CACHE=60):
+            response = self.client.get(self.post_001.get_absolute_url())  # 이 조회는 아직 flush 하지 않음
+            self.assertEqual(view_counts.flush(), 1)
+            response = self.client.get(self.post_001.get_absolute_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('조회 5', BeautifulSoup(response.content, 'html.parser').find('div', id='post-area').text)
+
+        # 많이 읽은 글은 모든 페이지에 보이므로 다시 센 순위가 바뀌면 리스트 페이지의 ETag 도 바뀜
+        etag = self.client.get('/blog/')['ETag']
+        Post.objects.filter(pk=self.post_002.pk).update(view_count=100)
+        cache.delete(view_counts.MOST_READ_CACHE_KEY.format(f'{get_version("posts")}:5'))  # BLOG_MOST_READ_CACHE 가 지남
+        response = self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        most_read = BeautifulSoup(response.content, 'html.parser').find('div', id='most-read-card')
+        self.assertIn('(100)', most_read.li.text)
+        # 순위가 그대로면 다시 세어도 ETag 는 그대로
+        cache.delete(view_counts.MOST_READ_CACHE_KEY.format(f'{get_version("posts")}:5'))
+        response = self.client.get('/blog/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_fragment_cache(self):
+        fragments.reset_fragment_stats()
+        self.addCleanup(fragments.reset_fragment_stats)
+
+        def card(soup, post):
+            return soup.find('div', id=f'post-{post.pk}').text
+
+        self.client.get('/blog/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/blog/')
+        self.assertEqual(fragments.get_fragment_stats(), {
+            'categories': {'hits': 1, 'misses': 1, 'hit_ratio': 0.5},
+            'post_card': {'hits': 3, 'misses': 3, 'hit_ratio': 0.5},
+        })
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].endswith('FROM "blog_category"')])
+
+        # 포스트를 저장하면 그 카드만 다시 그림
+        self.post_001.title = '바뀐 제목'
+        self.post_001.save()
+        soup = BeautifulSoup(self.client.get('/blog/').content, 'html.parser')
+        self.assertIn('바뀐 제목', card(soup, self.post_001))
+        self.assertEqual(fragments.get_fragment_stats()['post_card'], {'hits': 5, 'misses': 4, 'hit_ratio': 0.556})
+
+        # 태그나 카테고리가 바뀌면 버전이 올라가서 다시 그림
+        self.post_002.tags.add(self.tag_go)
+        self.category_python.name = '파이썬'
+        self.category_python.save()
+        soup = BeautifulSoup(self.client.get('/blog/').content, 'html.parser')
+        self.assertIn('go', card(soup, self.post_002))
+        self.assertIn('파이썬', card(soup, self.post_001))
+        self.assertIn('파이썬 (1)', soup.find('div', id='categories-card').text)
+
+        # render_markdown 으로 다시 렌더링하면 수정일자가 그대로여도 다시 그림
+        with mock.patch('blog.models.MARKDOWN_RENDER_VERSION', MARKDOWN_RENDER_VERSION + 1):  # 렌더러가 바뀜
+            Post.objects.filter(pk=self.post_003.pk).update(
+                excerpt_html='<p>다시 렌더링한 요약</p>', content_html_version=MARKDOWN_RENDER_VERSION + 1
+            )
+            soup = BeautifulSoup(self.client.get('/blog/').content, 'html.parser')
+        self.assertIn('다시 렌더링한 요약', card(soup, self.post_003))
+
+        # 통계는 스태프만 볼 수 있음
+        self.assertEqual(self.client.get('/blog/perf/fragments/').status_code, 403)
+        self.client.login(username='user1', password='somepassword')
+        self.assertEqual(self.client.get('/blog/perf/fragments/').json()['post_card']['misses'], 8)
+
+    def test_head_image_variants(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (1000, 600), (255, 0, 0, 128)).save(buffer, 'PNG')
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            post = Post.objects.create(
+                title='이미지 포스트',
+                content='이미지',
+                author=self.user_user1,
+                head_image=SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png'),
+            )
+            # 원본보다 작은 400, 800 크기만 원본 옆에 만들어져야 함
+            post.refresh_from_db()
+            self.assertEqual(sorted(post.head_image_variants['webp']), ['400', '800'])
+            webp_path = os.path.join(media_root, post.head_image_variants['webp']['400'])
+            self.assertEqual(os.path.dirname(webp_path), os.path.dirname(post.head_image.path))
+            with Image.open(webp_path) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (400, 240))
+
+            # 리스트 페이지에서는 srcset 으로 보여주고, 이미지가 없는 포스트는 자리 표시 이미지를 보여줌
+            soup = BeautifulSoup(self.client.get('/blog/').content, 'html.parser')
+            card = soup.find('div', id=f'post-{post.pk}')
+            self.assertIn('w400.webp 400w', card.source.attrs['srcset'])
+            self.assertIn('w800.jpeg 800w', card.img.attrs['srcset'])
+            placeholder_url = soup.find('div', id='post-1').img.attrs['src']
+            response = self.client.get(placeholder_url)
+            self.assertEqual(response['Content-Type'], 'image/svg+xml')
+
+            # 이미 있던 포스트는 명령으로 만들 수 있어야 함
+            Post.objects.filter(pk=post.pk).update(head_image_variants={})
+            etag = self.client.get(post.get_absolute_url())['ETag']
+            call_command('generate_image_variants', stdout=StringIO())
+            post.refresh_from_db()
+            self.assertEqual(sorted(post.head_image_variants['jpeg']), ['400', '800'])
+            # updated_at 은 그대로지만 srcset 이 바뀌었으므로 304 가 아니어야 함
+            response = self.client.get(post.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+            # 포스트를 지우면 만든 파일도 지워져야 함
+            post.delete()
+            self.assertFalse(os.path.exists(webp_path))
+
+    @override_settings(BLOG_TASKS_EAGER=False)
+    def test_task_queue(self):
+        # 큐 모드에서는 저장할 때 검색 색인이 바로 바뀌지 않고 작업만 쌓임 (같은 작업은 합쳐짐)
+        self.post_002.title = '큐에서 색인할 포스트'
+        self.post_002.save()
+        self.post_002.save()
+        self.assertEqual(Job.objects.filter(name='index_post', args=[self.post_002.pk]).count(), 1)
+        response = self.client.get('/blog/search/큐에서/')
+        self.assertIn('Search: 큐에서(0)', response.content.decode())
+
+        # 워커가 실행하면 색인이 바뀌고 실행 시간이 기록되어야 함
+        # 작업이 끝나면 버전이 올라가므로 색인 전의 ETag 로 요청해도 304 가 아니어야 함
+        call_command('run_tasks', once=True, stdout=StringIO())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+        response = self.client.get('/blog/search/큐에서/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Search: 큐에서(1)', response.content.decode())
+        self.assertIsNotNone(task_stats()['index_post']['avg_ms'])
+
+        # 실패한 작업은 max_attempts 까지 다시 시도
+        calls = []
+
+        @task
+        def flaky_task(value):
+            calls.append(value)
+            raise ValueError('boom')
+
+        self.addCleanup(registry.pop, 'flaky_task')
+        job = Job.objects.create(name='flaky_task', args=[1], key='flaky_task:[1]', max_attempts=2)
+        with self.assertLogs('blog.tasks', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        with self.assertLogs('blog.tasks', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('boom', job.last_error)
+        self.assertEqual(calls, [1, 1])
+
+        # 워커가 죽어서 running 으로 남은 작업은 남은 시도가 있을 때만 다시 대기열로
+        started_at = timezone.now() - timedelta(hours=1)
+        retry = Job.objects.create(name='flaky_task', args=[2], key='flaky_task:[2]', status=Job.RUNNING,
+                                   started_at=started_at, attempts=1, max_attempts=3)
+        poison = Job.objects.create(name='flaky_task', args=[3], key='flaky_task:[3]', status=Job.RUNNING,
+                                    started_at=started_at, attempts=3, max_attempts=3)
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=retry.pk).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=poison.pk).status, Job.FAILED)
+
+        # 바로 실행하는 모드에서 실패한 작업은 기록만 하고 요청은 그대로 성공
+        with self.settings(BLOG_TASKS_EAGER=True), self.assertLogs('blog.tasks', 'ERROR'):
+            self.assertIsNone(enqueue('flaky_task', 4))
+        self.assertEqual(calls, [1, 1, 4])
+
+    def test_build_static_site(self):
+        with tempfile.TemporaryDirectory() as output:
+            out = StringIO()
+            call_command('build_static_site', output=output, workers=1, stdout=out)
+            self.assertIn('(full)', out.getvalue())
+            for path in ('blog', f'blog/{self.post_001.pk}', 'blog/category/python', 'blog/category/no_category',
+                         f'blog/tag/{self.tag_rust_kor.slug}'):
+                self.assertTrue(os.path.exists(os.path.join(output, path, 'index.html')), path)
+            with open(os.path.join(output, f'blog/{self.post_002.pk}/index.html'), encoding='utf-8') as f:
+                self.assertIn(self.post_002.title, f.read())
+
+            # 아무것도 바뀌지 않았으면 다시 만드는 페이지가 없어야 함
+            out = StringIO()
+            call_command('build_static_site', output=output, workers=1, stdout=out)
+            self.assertIn('0개의 페이지', out.getvalue())
+
+            # 포스트 하나를 고치면 그 상세 페이지와 그 포스트가 보이는 리스트만 다시 만듦
+            self.post_002.title = '정적 페이지로 다시 만든 포스트'
+            self.post_002.save()
+            detail = os.path.join(output, f'blog/{self.post_001.pk}/index.html')
+            mtime = os.path.getmtime(detail)
+            out = StringIO()
+            call_command('build_static_site', output=output, workers=1, stdout=out)
+            self.assertIn('(incremental)', out.getvalue())
+            self.assertEqual(os.path.getmtime(detail), mtime)
+            with open(os.path.join(output, f'blog/{self.post_002.pk}/index.html'), encoding='utf-8') as f:
+                self.assertIn('정적 페이지로 다시 만든 포스트', f.read())
+            with open(os.path.join(output, 'blog/index.html'), encoding='utf-8') as f:
+                self.assertIn('정적 페이지로 다시 만든 포스트', f.read())
+
+            # 페이지를 만드는 요청은 조회수로 세지 않음
+            view_counts.flush()
+            self.assertFalse(Post.objects.filter(view_count__gt=0).exists())
+
+            def build():
+                out = StringIO()
+                call_command('build_static_site', output=output, workers=1, stdout=out)
+                return out.getvalue()
+
+            def read(pk):
+                with open(os.path.join(output, f'blog/{pk}/index.html'), encoding='utf-8') as f:
+                    return f.read()
+
+            # updated_at 이 바뀌지 않는 조회수, 이미지, 관련 포스트도 다시 만들어야 함
+            Post.objects.filter(pk=self.post_001.pk).update(view_count=7)
+            bump_version(f'views-{self.post_001.pk}')
+            self.assertIn('(incremental)', build())
+            self.assertIn('조회 7', read(self.post_001.pk))
+            # 많이 읽은 글의 캐시가 바뀌면 모든 페이지에 보이므로 전부 다시 만듦
+            cache.clear()
+            self.assertIn('(full)', build())
+            self.assertIn(f'<a href="{self.post_001.get_absolute_url()}">', read(self.post_003.pk))
+
+            RelatedPost.objects.filter(post=self.post_003).delete()
+            RelatedPost.objects.create(post=self.post_003, related=self.post_002, score=1, rank=0)
+            bump_version('related')
+            mtime = os.path.getmtime(detail)
+            self.assertIn('(incremental)', build())
+            self.assertEqual(os.path.getmtime(detail), mtime)
+            self.assertIn('id="related-posts"', read(self.post_003.pk))
+            # 관련 포스트의 제목이 바뀌면 그 포스트를 보여주는 상세 페이지도 다시 만듦
+            self.post_002.title = '관련 포스트로 보이는 포스트'
+            self.post_002.save()
+            RelatedPost.objects.update_or_create(
+                post=self.post_003, rank=0, defaults={'related': self.post_002, 'score': 1}
+            )
+            build()
+            self.assertIn('관련 포스트로 보이는 포스트', read(self.post_003.pk))
+
+            # 200 이 아닌 페이지가 있으면 빌드를 멈춤
+            with self.assertRaises(CommandError):
+                build_static_site.render_detail_pages(output, ['/blog/999999/'])
+
+        # 이 명령이 만들지 않은 폴더는 지우지 않음
+        with tempfile.TemporaryDirectory() as output:
+            other = os.path.join(output, 'keep.txt')
+            open(other, 'w').close()
+            with self.assertRaises(CommandError):
+                call_command('build_static_site', output=output, workers=1, stdout=StringIO())
+            self.assertTrue(os.path.exists(other))
+
+    @override_settings(BLOG_PERF_SERVER_TIMING=True, BLOG_PERF_N_PLUS_ONE=3)
+    def test_performance_middleware(self):
+        profiling.reset_stats()
+        self.addCleanup(profiling.reset_stats)
+
+        # 응답마다 Server-Timing 헤더가 붙고 뷰별 통계가 쌓여야 함
+        response = self.client.get(self.post_001.get_absolute_url())
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('markdown;dur=', response['Server-Timing'])
+
+        # 통계는 스태프만 볼 수 있음
+        self.assertEqual(self.client.get('/blog/perf/').status_code, 403)
+        self.client.login(username='user1', password='somepassword')
+        stats = self.client.get('/blog/perf/').json()
+        detail = stats['blog.views.PostDetail']
+        self.assertEqual(detail['count'], 1)
+        self.assertGreater(detail['queries']['p50'], 0)
+        self.assertGreater(detail['template']['p50'], 0)
+        self.assertGreaterEqual(detail['total']['max'], detail['db']['max'])
+
+        # URL 을 찾지 못한 요청은 주소마다 통계를 만들지 않고 한 곳에 모음
+        for i in range(3):
+            self.client.get(f'/no-such-page-{i}/')
+        stats = profiling.get_stats()
+        self.assertEqual(stats[profiling.UNRESOLVED]['count'], 3)
+        self.assertFalse([name for name in stats if 'no-such-page' in name])
+
+        # 끄면 미들웨어를 쓰지 않음
+        profiling.reset_stats()
+        with self.settings(BLOG_PERF_ENABLED=False):
+            response = Client().get(self.post_001.get_absolute_url())
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(profiling.get_stats(), {})
+
+        # 템플릿에서 같은 쿼리가 반복되면 템플릿 줄과 함께 로그로 남김
+        template = Template('{% for p in posts %}\n{{ p.author.username }}{% endfor %}')
+        with self.assertLogs('blog.profiling', 'WARNING') as logs:
+            with profiling.profile('n_plus_one_test'):
+                template.render(Context({'posts': Post.objects.all()}))
+        self.assertIn('N+1', logs.output[0])
+        self.assertIn('n_plus_one_test', logs.output[0])
+        self.assertIn(':2', logs.output[0])
+
+    def test_benchmark(self):
+        with tempfile.TemporaryDirectory() as output:
+            result_path = os.path.join(output, 'bench.json')
+            call_command('benchmark', seed=True, posts=30, comments=60, tags=5, categories=3, users=4,
+                         batch_size=10, requests=3, output=result_path, stdout=StringIO())
+            self.assertEqual(Post.objects.filter(title__startswith='벤치마크').count(), 30)
+            with open(result_path, encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertEqual(
+                set(report['results']), {'post_list', 'post_detail', 'search', 'tag_page', 'category_page'}
+            )
+            self.assertEqual(report['meta']['posts'], Post.objects.count())
+            self.assertGreater(report['results']['post_detail']['queries'], 0)
+
+            # 기준보다 쿼리가 늘면 실패해야 함
+            for result in report['results'].values():
+                result['queries'] = 0
+            baseline_path = os.path.join(output, 'baseline.json')
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f)
+            with self.assertRaisesMessage(CommandError, 'post_list queries'):
+                call_command('benchmark', requests=3, baseline=baseline_path, stdout=StringIO())
+
+        # 동시성 벤치마크는 읽기 프로세스가 하나 이상 있어야 함
+        with self.assertRaisesMessage(CommandError, '--readers'):
+            call_command('benchmark_concurrency', readers=0, stdout=StringIO())
+
+    @override_settings(BLOG_ASYNC_PARALLEL_QUERIES=False)  # 테스트는 트랜잭션 안에서 돌므로 DB 연결 하나로
+    def test_async_views(self):
+        # 비동기 뷰는 동기 뷰와 같은 페이지를 그려야 함
+        views = [
+            ('/blog/', async_views.post_list, {}),
+            (self.post_001.get_absolute_url(), async_views.post_detail, {'pk': self.post_001.pk}),
+            ('/blog/search/파이썬/', async_views.post_search, {'q': '파이썬'}),
+            (self.tag_rust_kor.get_absolute_url(), async_views.tag_page, {'slug': self.tag_rust_kor.slug}),
+            (self.category_python.get_absolute_url(), async_views.category_page, {'slug': 'python'}),
+            ('/blog/category/no_category/', async_views.category_page, {'slug': 'no_category'}),
+        ]
+        factory = AsyncRequestFactory()
+        for url, view, kwargs in views:
+            expected = self.client.get(url)
+            request = factory.get(url)
+            request.user = AnonymousUser()
+            response = async_to_sync(view)(request, **kwargs)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.content.decode(), expected.content.decode(), url)
+
+            # ETag 가 같으면 304
+            request = factory.get(url)
+            request.META['HTTP_IF_NONE_MATCH'] = response['ETag']
+            request.user = AnonymousUser()
+            self.assertEqual(async_to_sync(view)(request, **kwargs).status_code, 304, url)
+
+    def test_explain_queries(self):
+        # 주요 페이지의 쿼리는 인덱스를 써야 함 (행이 적은 테이블은 무시)
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('full scan 하는 쿼리가 없습니다.', out.getvalue())
+
+        # 카테고리 목록(사이드바)은 테이블 전체를 읽으므로 min_rows=0 이면 실패해야 함
+        with self.assertRaisesMessage(CommandError, 'full scan of blog_category'):
+            call_command('explain_queries', min_rows=0, stdout=StringIO())
+
+    def test_database_profile(self):
+        # 연결할 때 PRAGMA 프로필이 적용되어야 함
+        pragmas = get_sqlite_pragmas()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], pragmas['cache_size'])
+
+        # read_only 뷰의 읽기만 복제본으로 감
+        router = ReadReplicaRouter()
+        self.assertIsNone(read_only(router.db_for_read)(Post))
+        with override_settings(BLOG_READ_REPLICAS=['replica']):
+            self.assertIsNone(router.db_for_read(Post))
+            self.assertEqual(read_only(router.db_for_read)(Post), 'replica')
+            self.assertIsNone(read_only(router.db_for_write)(Post))
+            self.assertFalse(router.allow_migrate('replica', 'blog'))
+            self.assertIsNone(router.allow_migrate('default', 'blog'))
+
+        # mark_written 을 부른 세션은 BLOG_READ_YOUR_WRITES_SECONDS 동안 default 에서 읽음
+        def view(request):
+            return router.db_for_read(Post)
+
+        async def async_view(request):
+            return router.db_for_read(Post)
+
+        with override_settings(BLOG_READ_REPLICAS=['replica']):
+            request = AsyncRequestFactory().get('/blog/')
+            request.session = {}
+            self.assertEqual(read_only(view)(request), 'replica')
+            mark_written(request)
+            self.assertIsNone(read_only(view)(request))
+            self.assertIsNone(async_to_sync(read_only(async_view))(request))
+            with self.settings(BLOG_READ_YOUR_WRITES_SECONDS=0):
+                self.assertEqual(read_only(view)(request), 'replica')
+                self.assertEqual(async_to_sync(read_only(async_view))(request), 'replica')
+
+            # 댓글을 쓰면 세션에 쓴 시간이 남음
+            self.client.login(username='user1', password='somepassword')
+            self.client.post(self.post_001.get_absolute_url() + 'new_comment/', {'content': '복제본에 아직 없는 댓글'})
+            self.assertIn(LAST_WRITE_SESSION_KEY, self.client.session)
+        self.client.logout()
+
+        # 페이지는 그대로 보여야 함
+        self.assertEqual(self.client.get('/blog/').status_code, 200)
@@ -1,15 +1,38 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views, feeds
+from .db import read_only
+from .view_counts import count_views
+
+if settings.BLOG_ASYNC_VIEWS:  # ASGI 서버로 실행할 때는 읽기 전용 페이지를 비동기 뷰로
+    post_list, post_detail, post_search = async_views.post_list, async_views.post_detail, async_views.post_search
+    tag_page, category_page = async_views.tag_page, async_views.category_page
+else:
+    post_list, post_detail, post_search = views.PostList.as_view(), views.PostDetail.as_view(), views.PostSearch.as_view()
+    tag_page, category_page = views.tag_page, views.category_page
+
+# 읽기만 하는 페이지는 read_only 로 감싸서 복제본이 있으면 복제본에서 읽음 (settings.BLOG_READ_REPLICAS)
 
 urlpatterns = [
-    path('search/<str:q>/', views.PostSearch.as_view()),
+    path('search/<str:q>/', read_only(post_search)),
     path('delete_comment/<int:pk>/', views.delete_comment),
     path('update_post/<int:pk>/', views.PostUpdate.as_view()),
     path('update_comment/<int:pk>/', views.CommentUpdate.as_view()),
     path('create_post/', views.PostCreate.as_view()),
-    path('tag/<str:slug>/', views.tag_page),
-    path('category/<str:slug>/', views.category_page),
+    path('perf/', views.performance_stats),
+    path('perf/fragments/', views.fragment_cache_stats),
+    path('placeholder/<str:seed>/<int:width>x<int:height>.svg', views.placeholder),
+    path('tags/', read_only(views.tag_cloud)),
+    path('tag/<str:slug>/', read_only(tag_page)),
+    path('category/<str:slug>/', read_only(category_page)),
+    path('rss/', read_only(feeds.cached_feed(feeds.LatestPostsFeed()))),
+    path('atom/', read_only(feeds.cached_feed(feeds.LatestPostsAtomFeed()))),
+    path('category/<str:slug>/rss/', read_only(feeds.cached_feed(feeds.CategoryFeed()))),
+    path('category/<str:slug>/atom/', read_only(feeds.cached_feed(feeds.CategoryAtomFeed()))),
+    path('tag/<str:slug>/rss/', read_only(feeds.cached_feed(feeds.TagFeed()))),
+    path('tag/<str:slug>/atom/', read_only(feeds.cached_feed(feeds.TagAtomFeed()))),
     path('<int:pk>/new_comment/', views.new_comment),
-    path('', views.PostList.as_view()),
-    path('<int:pk>/', views.PostDetail.as_view())
+    path('<int:pk>/comments/', read_only(views.comment_list)),
+    path('', read_only(post_list)),
+    path('<int:pk>/', read_only(count_views(post_detail)))
 ]
\ No newline at end of file
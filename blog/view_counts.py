@@ -0,0 +1,139 @@
+"""
+포스트 조회수
+
+조회할 때마다 UPDATE 를 하면 SQLite 에서는 쓰기가 한 줄로 서야 하므로, 프로세스마다 메모리에 모아 두었다가
+ - settings.BLOG_VIEW_COUNT_FLUSH_SECONDS 초가 지났거나
+ - 모인 조회가 settings.BLOG_VIEW_COUNT_FLUSH_SIZE 개를 넘으면
+UPDATE 한 번(view_count = view_count + CASE id WHEN ... END)으로 더함
+읽어서 더한 값을 쓰지 않고 DB 안에서 더하므로 여러 워커 프로세스가 동시에 flush 해도 조회가 사라지지 않음
+프로세스가 끝날 때 남은 조회도 flush 함 (프로세스가 강제로 죽으면 마지막 몇 초의 조회는 잃을 수 있음)
+
+flush 하면 더한 포스트마다 'views-{pk}' 버전을 올려서 상세 페이지의 ETag 와 페이지 캐시가 새 조회수로 바뀌게 함
+(사이드바의 많이 읽은 글은 정확하지 않아도 되므로 settings.BLOG_MOST_READ_CACHE 동안 캐시를 씀)
+많이 읽은 글은 모든 페이지에 보이므로, 다시 센 순위가 바뀌었으면 'most-read' 버전을 올려서 모든 페이지의 ETag 가 바뀌게 함
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, DatabaseError
+from django.db.models import Case, F, Value, When
+
+from .caching import get_version, bump_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+MOST_READ_CACHE_KEY = 'blog:most_read:{}'
+MOST_READ_LAST_KEY = 'blog:most_read_last:{}'  # 마지막으로 센 순위, 다시 센 순위와 비교해서 바뀌었을 때만 버전을 올림
+# 이 키가 request.META 에 있으면 조회로 세지 않음 (build_static_site 처럼 페이지를 미리 만드는 요청)
+# HTTP 헤더는 HTTP_ 로 시작하는 키가 되므로 외부 요청으로는 넣을 수 없음
+SKIP_VIEW_COUNT = 'blog.skip_view_count'
+FLUSH_BATCH_SIZE = 500  # UPDATE 한 번에 넣을 포스트 수
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def _add(pk):  # 조회를 모으고 flush 할 때가 되었는지 돌려줌
+    with _lock:
+        _pending[pk] += 1
+        return sum(_pending.values()) >= getattr(settings, 'BLOG_VIEW_COUNT_FLUSH_SIZE', 500) or \
+            time.monotonic() - _last_flush >= getattr(settings, 'BLOG_VIEW_COUNT_FLUSH_SECONDS', 10)
+
+
+def record_view(pk):
+    if _add(pk):
+        flush()
+
+
+def flush():
+    """모아 둔 조회수를 DB 에 더하고 더한 조회 수를 돌려줌, 실패하면 다음 flush 에서 다시 시도"""
+    global _pending, _last_flush
+    with _lock:  # 다른 스레드는 flush 하는 동안 새 Counter 에 모음
+        pending, _pending = _pending, Counter()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+    items = sorted(pending.items())
+    try:
+        with transaction.atomic():
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = dict(items[start:start + FLUSH_BATCH_SIZE])
+                Post.objects.filter(pk__in=batch).update(view_count=F('view_count') + Case(
+                    *[When(pk=pk, then=Value(n)) for pk, n in batch.items()], default=Value(0)
+                ))
+    except DatabaseError:
+        logger.exception('failed to flush %s post views', sum(pending.values()))
+        with _lock:
+            _pending.update(pending)
+        return 0
+    bump_version(*(f'views-{pk}' for pk in pending))
+    return sum(pending.values())
+
+
+atexit.register(flush)
+
+
+def reset():  # 아직 flush 하지 않은 조회를 버림 (테스트용)
+    global _last_flush
+    with _lock:
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+
+def count_views(view_func):
+    """상세 페이지 뷰를 감싸서 200, 304 응답(캐시된 응답 포함)을 조회로 셈, 동기/비동기 뷰 모두 쓸 수 있음"""
+    def counted(request, response):
+        return request.method == 'GET' and response.status_code in (200, 304) \
+            and not request.META.get(SKIP_VIEW_COUNT)
+
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, pk, **kwargs):
+            response = await view_func(request, *args, pk=pk, **kwargs)
+            if counted(request, response) and _add(pk):
+                await sync_to_async(flush)()  # DB 에 쓰는 동안 이벤트 루프를 막지 않도록
+            return response
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, pk, **kwargs):
+        response = view_func(request, *args, pk=pk, **kwargs)
+        if counted(request, response):
+            record_view(pk)
+        return response
+    return wrapper
+
+
+def get_most_read(limit=None):
+    """조회수가 많은 포스트 [{'pk', 'title', 'url', 'view_count'}, ...], settings.BLOG_MOST_READ_CACHE 초 동안 캐시"""
+    limit = limit or getattr(settings, 'BLOG_MOST_READ', 5)
+    key = MOST_READ_CACHE_KEY.format(f'{get_version("posts")}:{limit}')  # 제목이 바뀌거나 지워지면 바로 새로 셈
+    posts = cache.get(key)
+    if posts is None:
+        posts = [
+            {'pk': pk, 'title': title, 'url': Post(pk=pk).get_absolute_url(), 'view_count': view_count}
+            for pk, title, view_count in
+            Post.objects.filter(view_count__gt=0).order_by('-view_count', '-pk')
+            .values_list('pk', 'title', 'view_count')[:limit]
+        ]
+        cache.set(key, posts, getattr(settings, 'BLOG_MOST_READ_CACHE', 60 * 5))
+        if cache.get(MOST_READ_LAST_KEY.format(limit)) != posts:
+            cache.set(MOST_READ_LAST_KEY.format(limit), posts, None)
+            bump_version('most-read')
+    return posts
+
+
+def get_most_read_version():
+    """ETag 에 넣을 많이 읽은 글의 버전, 순위의 캐시가 지났으면 먼저 다시 세서 바뀐 순위가 버전에 반영되게 함"""
+    get_most_read()
+    return get_version('most-read')
@@ -1,35 +1,94 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import Post, Category, Tag, Comment
 from .forms import CommentForm
+from .search import get_search_backend
+from .pagination import CursorPaginator, paginate_by_cursor
+from .tagging import parse_tags_str, sync_post_tags, get_tag_cloud, get_popular_tags
+from .avatars import attach_avatar_urls
+from .images import placeholder_svg
+from .profiling import get_stats
+from .fragments import get_fragment_stats
+from .related import get_related_posts
+from django.views.decorators.cache import cache_control
+from .db import mark_written
+from .caching import conditional_page, listing_etag, listing_last_modified, post_detail_etag, post_detail_last_modified
+from django.utils.decorators import method_decorator
 from django.core.exceptions import PermissionDenied
-from django.utils.text import slugify
-from django.db.models import Q
 import pprint
 
 # 태그 오류 수정 전.
 
+COMMENTS_PER_PAGE = 20
+
+
+def get_comment_paginator(post):
+    return CursorPaginator(post.comment_set.select_related('author'), COMMENTS_PER_PAGE, ordering=('pk',))
+
+
+def get_comment_page(post, after):
+    # 댓글 작성자와 아바타 URL 을 댓글 수와 상관없이 일정한 수의 쿼리로 가져옴
+    page = get_comment_paginator(post).page(after=after)
+    attach_avatar_urls(page.object_list)
+    return page
+
+
+def get_comment_next_url(post, page):
+    if page.has_next():
+        return f'{post.get_absolute_url()}comments/?after={page.next_cursor()}'
+    return None
+
+
+def get_comment_first_url(post, page):  # 중간 페이지부터 보고 있으면 처음 댓글로 돌아가는 주소
+    if page.has_previous():
+        return f'{post.get_absolute_url()}#comment-area'
+    return None
+
+
+def get_comment_url(comment):
+    # 댓글이 들어 있는 댓글 페이지를 상세 페이지에 그리는 주소
+    # 첫 페이지가 아니면 그 앞 페이지의 마지막 댓글을 ?comments_after= 커서로 넘김
+    post = comment.post
+    earlier = post.comment_set.filter(pk__lt=comment.pk).order_by('pk')
+    start = earlier.count() // COMMENTS_PER_PAGE * COMMENTS_PER_PAGE
+    if not start:
+        return comment.get_absolute_url()
+    cursor = get_comment_paginator(post).encode_cursor(Comment(pk=earlier.values_list('pk', flat=True)[start - 1]))
+    return f'{post.get_absolute_url()}?comments_after={cursor}#comment-{comment.pk}'
+
+@method_decorator(conditional_page(listing_etag, listing_last_modified), name='dispatch')
 class PostList(ListView):
     model = Post  # model을 정해 줌.
-    ordering = '-pk'
+    ordering = ('-created_at', '-pk')  # 커서 페이지네이션의 키, 마지막은 항상 pk
     paginate_by = 5
 
-    def get_context_data(self, **kwargs):
-        context = super(PostList, self).get_context_data()
-        context['categories'] = Category.objects.all()
-        context['no_category_post_count'] = Post.objects.filter(category=None).count()
-        return context
+    def get_queryset(self):
+        return super(PostList, self).get_queryset().for_list()
 
+    def paginate_queryset(self, queryset, page_size):  # OFFSET 대신 커서(keyset) 페이지네이션
+        context = paginate_by_cursor(self.request, queryset, page_size, self.get_ordering())
+        return context['paginator'], context['page_obj'], context['post_list'], context['is_paginated']
 
+
+@method_decorator(conditional_page(post_detail_etag, post_detail_last_modified), name='dispatch')
 class PostDetail(DetailView):
     model = Post
 
+    def get_queryset(self):  # 태그 뱃지는 쿼리 한 번으로 미리 가져옴
+        return super(PostDetail, self).get_queryset().prefetch_related('tags')
+
     def get_context_data(self, **kwargs):
         context = super(PostDetail, self).get_context_data()
-        context['categories'] = Category.objects.all()
-        context['no_category_post_count'] = Post.objects.filter(category=None).count()
         context['comment_form'] = CommentForm
+        # 댓글은 첫 페이지(?comments_after= 가 있으면 그 다음 페이지)만 그리고 나머지는 스크롤하면 comment_list 에서 불러옴
+        page = get_comment_page(self.object, after=self.request.GET.get('comments_after'))
+        context['comment_list'] = page.object_list
+        context['comment_next_url'] = get_comment_next_url(self.object, page)
+        context['comment_first_url'] = get_comment_first_url(self.object, page)
+        context['related_posts'] = get_related_posts(self.object)
         return context
 
 
@@ -47,22 +106,8 @@ class PostCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
             response = super(PostCreate, self).form_valid(form)
 
             tags_str = self.request.POST.get('tags_str')  # 템플릿에서 태그를 읽어옴
-            if tags_str:  # 태그가 채워져 있으면
-                tags_str = tags_str.strip()  # 양쪽의 공백 제거
-
-                if tags_str[-1] == ";":  # 공백태그 이슈 해결?
-                    tags_str = tags_str[:-1]
-
-                tags_str = tags_str.replace(',', ';')  # , 를 ; 로 대체
-                tags_list = tags_str.split(';')  # ;를 기준으로 나눔
-
-                for t in tags_list:
-                    t = t.strip()
-                    tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                    if is_tag_created:
-                        tag.slug = slugify(t, allow_unicode=True)
-                        tag.save()
-                    self.object.tags.add(tag)
+            sync_post_tags(self.object, parse_tags_str(tags_str))
+            mark_written(self.request)
 
             return response
 
@@ -94,63 +139,44 @@ class PostUpdate(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         response = super(PostUpdate, self).form_valid(form)
-        self.object.tags.clear()
 
         tags_str = self.request.POST.get('tags_str')
-        if tags_str:  # 태그가 채워져 있으면
-            tags_str = tags_str.strip()  # 양쪽의 공백 제거
-
-            if tags_str[-1] == ";":  # 공백태그 이슈 해결?
-                tags_str = tags_str[:-1]
-
-            tags_str = tags_str.replace(',', ';')  # , 를 ; 로 대체
-            tags_list = tags_str.split(';')  # ;를 기준으로 나눔
-
-            for t in tags_list:
-                t = t.strip()
-                tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                if is_tag_created:
-                    tag.slug = slugify(t, allow_unicode=True)
-                    tag.save()
-                self.object.tags.add(tag)
+        sync_post_tags(self.object, parse_tags_str(tags_str))  # 바뀐 태그만 추가, 삭제
+        mark_written(self.request)
 
         return response
 
 
+@conditional_page(listing_etag, listing_last_modified)
 def category_page(request, slug):
     if slug == 'no_category':
         category = '미분류'
-        post_list = Post.objects.filter(category=None)
+        post_list = Post.objects.filter(category=None).for_list()
     else:
         category = Category.objects.get(slug=slug)
-        post_list = Post.objects.filter(category=category)
+        post_list = Post.objects.filter(category=category).for_list()
 
+    context = paginate_by_cursor(request, post_list, PostList.paginate_by, PostList.ordering)
+    context['category'] = category
     return render(
         request,
         'blog/post_list.html',
-        {
-            'post_list': post_list,
-            'categories': Category.objects.all(),
-            'no_category_post_count': Post.objects.filter(category=None).count(),
-            'category': category,
-        }
+        context
     )
 
 
 # FBV
+@conditional_page(listing_etag, listing_last_modified)
 def tag_page(request, slug):
     tag = Tag.objects.get(slug=slug)
-    post_list = tag.post_set.all()
+    post_list = tag.post_set.for_list()
 
+    context = paginate_by_cursor(request, post_list, PostList.paginate_by, PostList.ordering)
+    context['tag'] = tag
     return render(
         request,
         'blog/post_list.html',
-        {
-            'post_list': post_list,
-            'tag': tag,
-            'categories': Category.objects.all(),
-            'no_category_post_count': Post.objects.filter(category=None).count(),
-        }
+        context
     )
 
 # FBV
@@ -165,13 +191,83 @@ def new_comment(request, pk):
                 comment.post = post # 댓글의 외래키로 연결된 포스트는 pk로 가져온 포스트가 됨
                 comment.author = request.user # 로그인한 사람의 정보로 저자 정보 채우기
                 comment.save()
-                return redirect(comment.get_absolute_url())
+                mark_written(request)  # 복제본이 늦어도 새 댓글이 보이도록
+                return redirect(get_comment_url(comment))  # 새 댓글이 있는 댓글 페이지로
             else:
                 return redirect(post.get_absolute_url()) # 브라우저에 입력해서 들어오면 포스트 페이지로 리다이렉트
         else:
             raise PermissionDenied
 
 
+# FBV
+@conditional_page(post_detail_etag, post_detail_last_modified)
+def comment_list(request, pk):  # 댓글을 페이지 단위로 돌려줌, 기본은 JSON 이고 ?format=html 이면 HTML 조각만
+    post = get_object_or_404(Post, pk=pk)
+    page = get_comment_page(post, after=request.GET.get('after'))
+    html = render_to_string('blog/comment_list_fragment.html', {'comment_list': page.object_list}, request)
+    next_url = get_comment_next_url(post, page)
+
+    if request.GET.get('format') == 'html':
+        response = HttpResponse(html)
+        if next_url:
+            response['X-Next-Page'] = next_url
+        return response
+
+    return JsonResponse({
+        'count': post.comment_count,
+        'next': next_url,
+        'html': html,
+        'comments': [
+            {
+                'pk': comment.pk,
+                'author': comment.author.username,
+                'avatar_url': comment.avatar_url,
+                'content': comment.content,
+                'created_at': comment.created_at,
+                'modified_at': comment.modified_at,
+            }
+            for comment in page.object_list
+        ],
+    })
+
+
+# FBV
+def tag_cloud(request):  # 모든 태그의 포스트 수, 기본은 JSON 이고 ?format=html 이면 태그 구름 HTML 조각만
+    tags = get_tag_cloud()
+    if request.GET.get('format') == 'html':
+        return render(request, 'blog/tag_cloud_fragment.html', {'tag_cloud': tags})
+
+    try:
+        limit = max(1, int(request.GET.get('limit', '')))
+    except ValueError:
+        limit = None
+    return JsonResponse({
+        'count': len(tags),
+        'tags': tags,
+        'popular': get_popular_tags(limit),
+    })
+
+
+# FBV
+def performance_stats(request):  # 뷰별 요청 시간 백분위 수 (ms), 스태프만 볼 수 있음
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse(get_stats())
+
+
+# FBV
+def fragment_cache_stats(request):  # 템플릿 조각 캐시의 조각별 hit/miss, 스태프만 볼 수 있음
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse(get_fragment_stats())
+
+
+@cache_control(public=True, max_age=60 * 60 * 24 * 365)
+def placeholder(request, seed, width, height):  # 이미지가 없는 포스트, 아바타에 쓰는 자리 표시 이미지
+    width, height = min(max(width, 1), 2000), min(max(height, 1), 2000)
+    return HttpResponse(placeholder_svg(seed, width, height), content_type='image/svg+xml')
+
+
 class CommentUpdate(LoginRequiredMixin, UpdateView):
     model = Comment
     form_class = CommentForm
@@ -182,29 +278,34 @@ class CommentUpdate(LoginRequiredMixin, UpdateView):
         else:
             raise PermissionDenied
 
+    def form_valid(self, form):
+        response = super(CommentUpdate, self).form_valid(form)
+        mark_written(self.request)
+        return response
+
 def delete_comment(request,pk): # 삭제 요청과 pk값을 인자로 받는다.
     comment = get_object_or_404(Comment, pk=pk) # pk로 댓글을 가져오거나 HTTP404를 발생시킨다.
     post = comment.post # 삭제하려는 댓글의 post
     if request.user.is_authenticated and request.user == comment.author:
         comment.delete()
+        mark_written(request)
         return redirect(post.get_absolute_url())
     else:
         raise PermissionDenied
 
 class PostSearch(PostList):
 
-    paginate_by = None
+    def get_ordering(self):
+        return get_search_backend().ordering
 
     def get_queryset(self):
         q = self.kwargs['q']
-        post_list = Post.objects.filter(
-            Q(title__contains=q) | Q(tags__name__contains=q)
-        ).distinct()
+        post_list = get_search_backend().search(Post.objects.for_list(), q)  # 관련도 순으로 정렬됨
         return post_list
 
     def get_context_data(self, **kwargs):
         context = super(PostSearch, self).get_context_data()
         q = self.kwargs['q']
-        context['search_info'] = f'Search: {q}({self.get_queryset().count()})'
+        context['search_info'] = f'Search: {q}({context["paginator"].count})'
 
         return context
\ No newline at end of file